@@ -0,0 +1,413 @@
+# benchmark.py
+
+# Benchmarks dos caminhos críticos do add-on, executáveis fora do Anki:
+#
+#     python benchmark.py [--sizes 100,1000] [--output atual.json] [--baseline anterior.json]
+#
+# O aqt e o anki são substituídos por stubs (mw.col falso, sem perfil). Os
+# cenários que dependem de widgets usam PyQt6 com QT_QPA_PLATFORM=offscreen e
+# são pulados quando o PyQt6 não está instalado. Para cada cenário são
+# registrados o tempo e o pico de memória (tracemalloc); com --baseline, um
+# tempo acima de REGRESSION_TOLERANCE vezes o anterior é tratado como regressão.
+
+import argparse
+import importlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from types import SimpleNamespace
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = 'delimitadores_bench'
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+MEDIA_FILES = ('img1.png', 'img2.png', 'audio1.mp3', 'video1.webm')
+MODEL = {
+    'name': 'Básico', 'id': 1, 'mod': 0, 'type': 0, 'sortf': 0,
+    'flds': [{'name': 'Frente', 'ord': 0}, {'name': 'Verso', 'ord': 1}],
+    'tmpls': [{'name': 'Card 1'}],
+}
+PREVIEW_MOVES = 200  # Mudanças de linha simuladas no cenário update_preview
+REGRESSION_TOLERANCE = 1.5
+
+
+# ---------------------------------------------------------------------------
+# Stubs do Anki
+
+class FakeNote:
+    def __init__(self, modelo):
+        self.id = 0
+        self.fields = [''] * len(modelo['flds'])
+        self.tags = []
+
+
+class FakeCol:
+    def __init__(self, media_dir):
+        self.added = 0
+        self.models = SimpleNamespace(by_name=lambda name: MODEL, all_names=lambda: [MODEL['name']])
+        self.decks = SimpleNamespace(
+            by_name=lambda name: {'id': 1},
+            id=lambda name: 1,
+            all_names_and_ids=lambda: [SimpleNamespace(name='Padrão', id=1)],
+        )
+        self.media = SimpleNamespace(dir=lambda: media_dir)
+        # Coleção vazia: nenhum card é duplicado
+        self.db = SimpleNamespace(execute=lambda sql, *args: [])
+        self.mod = 0
+
+    def new_note(self, modelo):
+        return FakeNote(modelo)
+
+    def add_note(self, nota, deck_id):
+        self.added += 1
+
+    def add_notes(self, requests):
+        self.added += len(requests)
+
+    def add_custom_undo_entry(self, name):
+        return 1
+
+    def merge_undo_entries(self, pos):
+        return None
+
+
+class FakeCollectionOp:
+    # Executa a operação na hora, na mesma thread
+    def __init__(self, parent, op):
+        self.op = op
+        self.on_success = None
+        self.on_failure = None
+
+    def success(self, callback):
+        self.on_success = callback
+        return self
+
+    def failure(self, callback):
+        self.on_failure = callback
+        return self
+
+    def run_in_background(self):
+        try:
+            result = self.op(sys.modules['aqt'].mw.col)
+        except Exception as e:
+            if self.on_failure is None:
+                raise
+            self.on_failure(e)
+            return
+        if self.on_success is not None:
+            self.on_success(result)
+
+
+class FakeSettings:
+    def setAttribute(self, attr, value):
+        pass
+
+
+def make_web_view_class(QWidget):
+    class FakeWebView(QWidget):
+        # Registra apenas o volume de HTML enviado, sem abrir o Chromium
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.set_html_calls = 0
+            self.html_chars = 0
+
+        def settings(self):
+            return FakeSettings()
+
+        def setHtml(self, html, base_url=None):
+            self.set_html_calls += 1
+            self.html_chars += len(html)
+
+        def page(self):
+            return SimpleNamespace(runJavaScript=lambda *args: None)
+
+    return FakeWebView
+
+
+def new_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def load_qt():
+    try:
+        from PyQt6 import QtCore, QtGui, QtWidgets
+    except ImportError:
+        return None
+    namespace = {}
+    for qt_module in (QtCore, QtGui, QtWidgets):
+        namespace.update({k: v for k, v in vars(qt_module).items() if not k.startswith('_')})
+    namespace['QWebEngineSettings'] = SimpleNamespace(WebAttribute=SimpleNamespace(
+        LocalContentCanAccessFileUrls=0, LocalContentCanAccessRemoteUrls=1,
+        AllowRunningInsecureContent=2, PlaybackRequiresUserGesture=3,
+    ))
+    return namespace
+
+
+def install_stubs(media_dir):
+    qt = load_qt()
+    mw = SimpleNamespace(
+        col=FakeCol(media_dir),
+        taskman=SimpleNamespace(run_on_main=lambda callback: callback()),
+        progress=SimpleNamespace(update=lambda **kwargs: None, want_cancel=lambda: False),
+        update_undo_actions=lambda: None,
+    )
+    new_module('anki')
+    new_module(
+        'anki.utils',
+        strip_html=lambda html: re.sub(r'<[^>]+>', '', html),
+        strip_html_media=lambda html: re.sub(r'<[^>]+>', '', html),
+        field_checksum=lambda text: hash(text) & 0xFFFFFFFF,
+        split_fields=lambda flds: flds.split('\x1f'),
+        ids2str=lambda ids: f"({','.join(str(i) for i in ids)})",
+    )
+    new_module('anki.collection', AddNoteRequest=lambda note, deck_id: (note, deck_id))
+    hook = SimpleNamespace(append=lambda callback: None, remove=lambda callback: None)
+    new_module('aqt', mw=mw, gui_hooks=SimpleNamespace(operation_did_execute=hook))
+    new_module('aqt.utils', showInfo=lambda *args, **kwargs: None, showWarning=lambda *args, **kwargs: None)
+    new_module('aqt.operations', CollectionOp=FakeCollectionOp)
+    new_module('aqt.qt', **(qt or {}))
+    if qt is not None:
+        new_module('aqt.webview', QWebEngineView=make_web_view_class(qt['QWidget']))
+
+    # Registrar o pacote sem executar o __init__.py (que mexe no menu do Anki)
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [ADDON_DIR]
+    sys.modules[PACKAGE] = package
+    return qt
+
+
+def addon_module(name):
+    return importlib.import_module(f'{PACKAGE}.{name}')
+
+
+# ---------------------------------------------------------------------------
+# Entradas sintéticas
+
+def make_lines(n, media):
+    lines = []
+    for i in range(n):
+        verso = f"Resposta {i} com <i>detalhes</i>"
+        if media and i % 5 == 0:
+            verso += f' <img src="{MEDIA_FILES[i % 2]}">'
+        if media and i % 50 == 0:
+            verso += f' <video src="{MEDIA_FILES[3]}" controls width="320" height="240"></video>'
+        lines.append(f"Pergunta <b>{i}</b> sobre o tema {i % 97} ; {verso}")
+    return '\n'.join(lines)
+
+
+def make_tags(n):
+    return '\n'.join(f"tema{i % 10}, lote" for i in range(n))
+
+
+def make_markdown(n, media):
+    # Uma tabela com n linhas seguida de uma segunda tabela pequena (várias tabelas no mesmo texto)
+    img = f' <img src="{MEDIA_FILES[0]}">' if media else ''
+    rows = [f"| item {i} | valor {i}{img if i % 5 == 0 else ''} | obs {i % 7} |" for i in range(n)]
+    small = [f"| {i} | {i * 2} |" for i in range(10)]
+    return '\n'.join(
+        ["Texto antes da tabela", "| Item | Valor | Obs |", "| --- | --- | --- |"] + rows
+        + ["Texto entre as tabelas", "| A | B |", "| :-: | --- |"] + small + ["Texto depois"]
+    )
+
+
+def make_raw_html(n, media):
+    rows = ''.join(f"<tr><td>item {i}</td><td><b>valor</b> {i}</td></tr>\n" for i in range(n // 2))
+    paragraphs = ''.join(
+        f'<p style="margin:0">Linha {i} com <span style="color:red">cor</span>'
+        + (f' <img src="{MEDIA_FILES[0]}">' if media and i % 5 == 0 else '') + '</p>\n'
+        for i in range(n - n // 2)
+    )
+    return f'<html><head><meta charset="utf-8"></head><body><div>{paragraphs}<table>{rows}</table></div></body></html>'
+
+
+def create_media_files(media_dir):
+    for i, file_name in enumerate(MEDIA_FILES):
+        with open(os.path.join(media_dir, file_name), 'wb') as f:
+            f.write(os.urandom(1024 * (i + 1) * 64))
+
+
+# ---------------------------------------------------------------------------
+# Cenários: cada um recebe (ambiente, tamanho, mídia) e devolve a função medida
+
+def scenario_parse_cards(env, n, media):
+    card_parser = addon_module('card_parser')
+    card_parser.split_line.cache_clear()
+    text, tags = make_lines(n, media), make_tags(n)
+    return lambda: card_parser.parse_cards(text, tags, [';'], 2, True)
+
+
+def scenario_convert_markdown(env, n, media):
+    markdown_tables = addon_module('markdown_tables')
+    markdown = make_markdown(n, media)
+    return lambda: markdown_tables.convert_markdown_to_html(markdown)
+
+
+def scenario_clean_raw_html(env, n, media):
+    html_sanitizer = addon_module('html_sanitizer')
+    html = make_raw_html(n, media)
+    return lambda: html_sanitizer.clean_raw_html(html)
+
+
+def scenario_highlight(env, n, media):
+    highlighter_module = addon_module('highlighter')
+    document = env.qt['QTextDocument']()
+    document.setPlainText(make_lines(n, media))
+    highlighter = highlighter_module.HtmlTagHighlighter(document)
+    env.keep.append((document, highlighter))
+    return highlighter.rehighlight
+
+
+def scenario_update_preview(env, n, media):
+    dialog = env.load_dialog(n, media)
+    document = dialog.txt_entrada.document()
+    step = max(1, n // PREVIEW_MOVES)
+    QTextCursor = env.qt['QTextCursor']
+
+    def run():
+        for line in range(0, n, step):
+            dialog.txt_entrada.setTextCursor(QTextCursor(document.findBlockByNumber(line)))
+        dialog.preview_scheduler.flush()
+    return run
+
+
+def scenario_generate_card_previews(env, n, media):
+    dialog = env.load_dialog(n, media)
+    visualizar = addon_module('visualizar').VisualizarCards(dialog)
+    env.keep.append(visualizar)
+
+    def run():
+        visualizar.set_cards(visualizar.generate_card_previews())
+        for index in range(min(20, len(visualizar.cards))):
+            visualizar.render_card(index)
+    return run
+
+
+def scenario_add_cards(env, n, media):
+    dialog = env.load_dialog(n, media)
+    return dialog.add_cards
+
+
+# (nome, precisa do Qt, função)
+SCENARIOS = [
+    ('parse_cards', False, scenario_parse_cards),
+    ('convert_markdown_to_html', False, scenario_convert_markdown),
+    ('paste_raw_html_cleanup', False, scenario_clean_raw_html),
+    ('highlightBlock', True, scenario_highlight),
+    ('update_preview', True, scenario_update_preview),
+    ('generate_card_previews', True, scenario_generate_card_previews),
+    ('add_cards', True, scenario_add_cards),
+]
+
+
+class Environment:
+    def __init__(self, media_dir, qt):
+        self.media_dir = media_dir
+        self.qt = qt
+        self.keep = []
+        self.dialog_module = None
+        self.dialog = None
+        self.loaded = None
+        if qt is not None:
+            self.app = qt['QApplication'].instance() or qt['QApplication']([])
+            self.dialog_module = addon_module('dialog')
+            # Não ler/gravar o config.json real do usuário
+            self.dialog_module.CONFIG_FILE = os.path.join(media_dir, 'config.json')
+            self.dialog = self.dialog_module.CustomDialog()
+            self.dialog.lista_decks.setCurrentRow(0)
+            self.dialog.lista_notetypes.setCurrentRow(0)
+            self.dialog.chk_delimitadores['Ponto e Vírgula'].setChecked(True)
+
+    def load_dialog(self, n, media):
+        # Preencher o diálogo compartilhado (fora da medição)
+        if self.loaded != (n, media):
+            self.dialog.txt_entrada.setPlainText(make_lines(n, media))
+            self.dialog.txt_tags.setPlainText(make_tags(n))
+            self.dialog.preview_scheduler.flush()
+            self.loaded = (n, media)
+        self.dialog.preview_engine.invalidate()
+        return self.dialog
+
+
+def measure(setup):
+    # Tempo e memória são medidos em execuções separadas: o tracemalloc deixa
+    # o código bem mais lento e distorceria o tempo
+    run = setup()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+
+    run = setup()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run_benchmarks(sizes, only=None):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    media_dir = tempfile.mkdtemp(prefix='delimitadores_bench_')
+    create_media_files(media_dir)
+    qt = install_stubs(media_dir)
+    env = Environment(media_dir, qt)
+    results = []
+    for name, needs_qt, scenario in SCENARIOS:
+        if only and name not in only:
+            continue
+        if needs_qt and qt is None:
+            print(f"{name}: pulado (PyQt6 não instalado)")
+            continue
+        for n in sizes:
+            for media in (False, True):
+                elapsed, peak = measure(lambda: scenario(env, n, media))
+                results.append({'scenario': name, 'lines': n, 'media': media, 'seconds': elapsed, 'peak_bytes': peak})
+                print(f"{name:<26} {n:>7} linhas  {'com' if media else 'sem'} mídia  {elapsed * 1000:>10.1f} ms  {peak / 1024 / 1024:>8.2f} MiB")
+    return results
+
+
+def compare(results, baseline):
+    # Devolve as linhas de regressão em relação a um resultado anterior
+    anteriores = {(r['scenario'], r['lines'], r['media']): r for r in baseline}
+    regressions = []
+    for r in results:
+        anterior = anteriores.get((r['scenario'], r['lines'], r['media']))
+        if anterior and r['seconds'] > anterior['seconds'] * REGRESSION_TOLERANCE:
+            regressions.append(
+                f"{r['scenario']} ({r['lines']} linhas, {'com' if r['media'] else 'sem'} mídia): "
+                f"{anterior['seconds'] * 1000:.1f} ms -> {r['seconds'] * 1000:.1f} ms"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do add-on Delimitadores (sem Anki)")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="quantidades de linhas, separadas por vírgula")
+    parser.add_argument('--only', default='', help="cenários a executar, separados por vírgula")
+    parser.add_argument('--output', help="gravar os resultados em JSON")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para detectar regressões")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    only = {name for name in args.only.split(',') if name}
+    results = run_benchmarks(sizes, only)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(f"REGRESSÃO: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# bulk_add.py
+
+# Inserção em lote das notas: o deck e o tipo de nota são resolvidos uma vez,
+# as notas são inseridas em lotes pelo backend e tudo fica agrupado em um
+# único passo "Adicionar N cards" no Desfazer. O trabalho roda fora da thread
+# da interface (CollectionOp), informando o progresso e aceitando cancelamento
+# entre um lote e outro. Os cards podem vir de uma lista ou de um gerador
+# (importação de arquivo), lido lote a lote sem ser materializado. Cards cujo
+# primeiro campo já existe no tipo de nota podem ser pulados, atualizar a
+# nota existente ou ser adicionados mesmo assim (duplicates.py). No modo
+# atualizar, só as notas com algum campo ou tag diferente são gravadas (em
+# lote, com update_notes), mantendo os cards e o agendamento delas.
+
+from itertools import islice
+from anki.utils import strip_html_media
+from .duplicates import DuplicateIndex, DUPLICATE_ALLOW, DUPLICATE_UPDATE
+
+try:
+    from anki.collection import AddNoteRequest
+except ImportError:  # Versões antigas do Anki, sem add_notes em lote
+    AddNoteRequest = None
+
+# Quantidade de notas inseridas por chamada ao backend
+BATCH_SIZE = 500
+
+
+def build_notes(col, modelo, cards):
+    notes = []
+    for card in cards:
+        nota = col.new_note(modelo)
+        for j, campo in enumerate(card.fields):
+            nota.fields[j] = campo
+        nota.tags.extend(card.tags)
+        notes.append(nota)
+    return notes
+
+
+def insert_notes(col, notes, deck_id):
+    if AddNoteRequest is not None:
+        col.add_notes([AddNoteRequest(note=nota, deck_id=deck_id) for nota in notes])
+    else:
+        for nota in notes:
+            col.add_note(nota, deck_id)
+
+
+def update_existing(col, existing):
+    # existing: (card, id da nota); campos sobrescritos, tags acrescentadas (as
+    # da nota são mantidas). Devolve as notas gravadas.
+    notes = {}
+    for card, nid in existing:
+        nota = notes.get(nid) or col.get_note(nid)
+        for j, campo in enumerate(card.fields):
+            nota.fields[j] = campo
+        for tag in card.tags:
+            if not nota.has_tag(tag):
+                nota.tags.append(tag)
+        notes[nid] = nota
+    col.update_notes(list(notes.values()))
+    return notes.values()
+
+
+def split_duplicates(index, batch):
+    # (novos, existentes, adiados): um card que repete o primeiro campo de outro
+    # card novo do mesmo lote é adiado e conferido depois que o primeiro for inserido
+    found = index.find_all((i, card.fields[0]) for i, card in enumerate(batch))
+    new, existing, deferred = [], [], []
+    seen = set()
+    for i, card in enumerate(batch):
+        if i in found:
+            existing.append((card, found[i][0]))
+            continue
+        key = strip_html_media(card.fields[0])
+        if key.strip() and key in seen:
+            deferred.append(card)
+        else:
+            seen.add(key)
+            new.append(card)
+    return new, existing, deferred
+
+
+class BulkAddJob:
+    def __init__(self, modelo, deck_id, cards, duplicates=DUPLICATE_ALLOW):
+        self.modelo = modelo
+        self.deck_id = deck_id
+        self.cards = cards
+        self.total = len(cards) if isinstance(cards, list) else None  # None = desconhecido (gerador)
+        self.duplicates = duplicates  # DUPLICATE_SKIP, DUPLICATE_UPDATE ou DUPLICATE_ALLOW
+        self.processed = 0
+        self.added = 0
+        self.skipped = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.cancelled = False
+
+    def cancel(self):
+        # Pedido de cancelamento: vale a partir do próximo lote
+        self.cancelled = True
+
+    def run(self, col, on_progress=None):
+        # Executado em segundo plano; os lotes já inseridos permanecem (e podem ser desfeitos juntos)
+        pos = col.add_custom_undo_entry(f"Adicionar {self.total} cards" if self.total is not None else "Importar cards")
+        # Índice dos primeiros campos do tipo de nota: uma consulta para toda a adição
+        index = DuplicateIndex(col, self.modelo['id']) if self.duplicates != DUPLICATE_ALLOW else None
+        cards = iter(self.cards)
+        while not self.cancelled:
+            batch = list(islice(cards, BATCH_SIZE))
+            if not batch:
+                break
+            if index is None:
+                self.add_batch(col, batch)
+            else:
+                pending = batch
+                while pending:
+                    new, existing, pending = split_duplicates(index, pending)
+                    for nota in self.add_batch(col, new):
+                        index.add(nota)
+                    if self.duplicates == DUPLICATE_UPDATE:
+                        self.update_batch(col, index, existing)
+                    else:
+                        self.skipped += len(existing)
+            self.processed += len(batch)
+            if on_progress:
+                on_progress(self.processed, self.total)
+        return col.merge_undo_entries(pos)
+
+    def update_batch(self, col, index, existing):
+        changed = [(card, nid) for card, nid in existing if index.is_changed(nid, card)]
+        self.unchanged += len(existing) - len(changed)
+        if changed:
+            for nota in update_existing(col, changed):
+                index.set_note(nota.id, nota.fields, nota.tags)
+            self.updated += len(changed)
+
+    def add_batch(self, col, cards):
+        notes = build_notes(col, self.modelo, cards)
+        if notes:
+            insert_notes(col, notes, self.deck_id)
+        self.added += len(notes)
+        return notes
@@ -0,0 +1,185 @@
+# card_parser.py
+
+# Núcleo de parsing dos cards, sem dependência do Qt nem do Anki: transforma o
+# texto digitado + o texto das etiquetas + os delimitadores marcados em uma
+# lista de registros compactos. É usado pela pré-visualização, pela janela
+# Visualizar Cards e pelo add_cards, e pode ser medido fora do Anki.
+
+import re
+from functools import lru_cache
+
+DIGITOS = '0123456789'
+
+# Trechos em que um delimitador não separa campos: tags HTML (atributos,
+# estilos), cloze {{c1::...}}, campos inteiros entre aspas e URLs (https://...).
+# Só são tags as que começam com letra, / ou ! ("a < b ; c > d" não é tag).
+TAG_PATTERN = r'<[A-Za-z/!][^>]*>'
+PROTECTED_PATTERNS = (
+    r'\{\{.*?\}\}',
+)
+# Só entra no padrão quando a linha tem '://' (testar um esquema em cada palavra custa caro)
+URL_PATTERN = r'\b[A-Za-z][\w+.-]*://[^\s<>"\';|,]*'
+
+# Conteúdo entre aspas, com "" representando uma aspa (como no CSV)
+QUOTED_FIELD = re.compile(r'"((?:[^"\n]|"")*)"')
+
+
+class ParsedCard:
+    __slots__ = ('line', 'fields', 'tags')
+
+    def __init__(self, line, fields, tags):
+        self.line = line  # Número da linha (bloco) no campo de texto
+        self.fields = fields  # Tupla com os campos já sem espaços nas pontas
+        self.tags = tags  # Tupla com as tags finais do card
+
+    def __repr__(self):
+        return f"ParsedCard({self.line!r}, {self.fields!r}, {self.tags!r})"
+
+
+def quoted_field_pattern(delimitadores):
+    # Campo inteiro entre aspas ("a; b"): a aspa de abertura vem no início da
+    # linha ou logo depois de um delimitador e a de fechamento logo antes de
+    # um delimitador ou do fim da linha (só espaços entre eles). Aspas no
+    # meio do texto (12" ; 15") não protegem nada.
+    antes = '|'.join(['^'] + [f'(?<={re.escape(d)})' for d in delimitadores])
+    depois = '|'.join([re.escape(d) for d in delimitadores] + ['$'])
+    return rf'(?:{antes}) *"(?:[^"\n]|"")*" *(?={depois})'
+
+
+def unquote(campo):
+    # Campo inteiro entre aspas: sem as aspas e com "" de volta a " (como no CSV)
+    if campo.startswith('"'):
+        match = QUOTED_FIELD.fullmatch(campo)
+        if match:
+            return match.group(1).replace('""', '"')
+    return campo
+
+
+class SplitPlan:
+    # Plano de divisão montado uma vez por conjunto de delimitadores. Vale o
+    # primeiro delimitador marcado (na ordem das caixas) que aparece fora dos
+    # trechos protegidos. Uma busca rápida (guard) descarta as linhas em que
+    # nenhum delimitador pode estar protegido, que são divididas com split;
+    # as demais são percorridas uma só vez por um padrão que consome os
+    # trechos protegidos e captura as tags e os delimitadores (a mesma
+    # passada serve ao realce do campo de texto).
+    __slots__ = ('delimitadores', 'priority', 'guard', 'pattern', 'url_pattern')
+
+    def __init__(self, delimitadores):
+        self.delimitadores = delimitadores
+        self.priority = {}
+        for i, delim in enumerate(delimitadores):
+            self.priority.setdefault(delim, i)
+        chars = re.escape(''.join(sorted(set(''.join(delimitadores)))))
+        # Delimitador depois de um < ainda aberto ou de uma aspa ainda aberta, ou um cloze
+        self.guard = re.compile(rf'<[^>{chars}]*[{chars}]|"[^"\n{chars}]*[{chars}]|\{{\{{')
+        protected = (f'(?P<tag>{TAG_PATTERN})',) + PROTECTED_PATTERNS + (quoted_field_pattern(self.priority),)
+        alternativas = '|'.join(re.escape(d) for d in sorted(self.priority, key=len, reverse=True))
+        self.pattern = re.compile('|'.join(protected) + f'|(?P<delim>{alternativas})')
+        self.url_pattern = re.compile('|'.join(protected + (URL_PATTERN,)) + f'|(?P<delim>{alternativas})')
+
+    def is_plain(self, linha):
+        # Nenhum delimitador da linha está dentro de tag, cloze, aspas ou URL
+        return '://' not in linha and self.guard.search(linha) is None
+
+    def plain_delimiter(self, linha):
+        for delim in self.delimitadores:
+            if delim in linha:
+                return delim
+        return None
+
+    def split(self, linha):
+        # Campos sem espaços nas pontas; None se a linha não tem delimitador
+        if self.is_plain(linha):
+            delim = self.plain_delimiter(linha)
+            return tuple(unquote(parte.strip()) for parte in linha.split(delim)) if delim else None
+        delim, spans = self.field_spans(linha)
+        if delim is None:
+            return None
+        return tuple(unquote(linha[start:end].strip()) for start, end in spans)
+
+    def scan(self, linha):
+        # Uma passada pelo padrão completo: ((início, fim) de cada tag, delimitador,
+        # posições do delimitador); (tags, None, []) se a linha não tem delimitador
+        tags = []
+        found = {}
+        pattern = self.url_pattern if '://' in linha else self.pattern
+        for match in pattern.finditer(linha):
+            group = match.lastgroup
+            if group == 'tag':
+                tags.append(match.span())
+            elif group == 'delim':
+                found.setdefault(match.group(group), []).append(match.start())
+        if not found:
+            return tags, None, []
+        delim = min(found, key=self.priority.__getitem__)
+        return tags, delim, found[delim]
+
+    def field_spans(self, linha):
+        # (delimitador, ((início, fim) de cada campo, ...)) ou (None, ()) se a linha não tem delimitador
+        if self.is_plain(linha):
+            delim = self.plain_delimiter(linha)
+            if delim is None:
+                return None, ()
+            positions = []
+            pos = linha.find(delim)
+            while pos >= 0:
+                positions.append(pos)
+                pos = linha.find(delim, pos + len(delim))
+        else:
+            tags, delim, positions = self.scan(linha)
+            if delim is None:
+                return None, ()
+        spans = []
+        start = 0
+        for pos in positions:
+            spans.append((start, pos))
+            start = pos + len(delim)
+        spans.append((start, len(linha)))
+        return delim, tuple(spans)
+
+
+@lru_cache(maxsize=64)
+def split_plan(delimitadores):
+    return SplitPlan(tuple(delimitadores))
+
+
+def field_spans(linha, delimitadores):
+    return split_plan(delimitadores).field_spans(linha)
+
+
+@lru_cache(maxsize=4096)
+def split_line(linha, delimitadores):
+    # Campos da linha já sem espaços nas pontas; None se não for um card
+    if not delimitadores or not linha.strip():
+        return None
+    return split_plan(delimitadores).split(linha)
+
+
+def parse_tags(tags_line, numerar, line):
+    # Tags separadas por vírgula. Com "Numerar Tags" os números já existentes
+    # no final são removidos e o número da linha é acrescentado.
+    if not tags_line:
+        return ()
+    tags = [tag.strip() for tag in tags_line.split(',') if tag.strip()]
+    if numerar:
+        return tuple(f"{tag.rstrip(DIGITOS)}{line + 1}" for tag in tags)
+    return tuple(tags)
+
+
+def parse_cards(texto, tags_texto, delimitadores, num_fields=None, numerar_tags=False):
+    # Uma única passada pelas linhas do texto (e pelas linhas de tags em paralelo)
+    delimitadores = tuple(delimitadores)
+    if not delimitadores:
+        return []
+    tags_lines = iter(tags_texto.split('\n')) if tags_texto else iter(())
+    cards = []
+    for line, linha in enumerate(texto.split('\n')):
+        tags_line = next(tags_lines, '')
+        partes = split_line(linha, delimitadores)
+        if partes is None:
+            continue
+        if num_fields is not None:
+            partes = partes[:num_fields]
+        cards.append(ParsedCard(line, partes, parse_tags(tags_line, numerar_tags, line)))
+    return cards
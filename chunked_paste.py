@@ -0,0 +1,101 @@
+# chunked_paste.py
+
+# Colagem em lotes para textos muito grandes (ex.: planilhas inteiras do
+# Excel). As linhas são convertidas sob demanda por um gerador e inseridas
+# alguns milhares por vez, devolvendo o controle à interface entre um lote e
+# outro. Enquanto isso, os sinais do campo de cards ficam suspensos (sem
+# pré-visualização a cada lote) e o campo fica somente leitura; tudo vira um
+# único passo de desfazer. Ações que leem ou reescrevem o texto inteiro
+# chamam complete() antes, para não verem uma colagem pela metade.
+
+from aqt.qt import QTimer
+
+# Linhas inseridas por lote
+PASTE_BATCH_LINES = 5000
+
+
+def iter_excel_lines(text):
+    # Cada linha do Excel (colunas separadas por tabulação) vira uma linha com ponto e vírgula
+    text = text.strip()
+    start = 0
+    while start <= len(text):
+        end = text.find('\n', start)
+        if end < 0:
+            end = len(text)
+        yield ' ; '.join(col.strip() for col in text[start:end].split('\t'))
+        start = end + 1
+
+
+def iter_batches(lines, batch_lines=PASTE_BATCH_LINES):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_lines:
+            yield '\n'.join(batch)
+            batch = []
+    if batch:
+        yield '\n'.join(batch)
+
+
+class ChunkedPaste:
+    def __init__(self, edit, lines, on_finished=None, batch_lines=PASTE_BATCH_LINES):
+        self.edit = edit
+        self.cursor = edit.textCursor()
+        self.batches = iter_batches(lines, batch_lines)
+        self.on_finished = on_finished
+        self.batch_count = 0
+        self.pending = None  # Próximo lote, já convertido
+        self.signals_blocked = False
+        self.running = False
+
+    def start(self):
+        # O primeiro lote é inserido na hora: colagens pequenas terminam sem passar pelo timer
+        self.running = True
+        self.signals_blocked = self.edit.blockSignals(True)
+        self.edit.setReadOnly(True)
+        self.step()
+
+    def step(self):
+        if not self.running:
+            return  # Já concluída (complete) ou cancelada
+        if self.insert_batch():
+            QTimer.singleShot(0, self.step)
+        else:
+            self.finish()
+
+    def insert_batch(self):
+        # Insere o próximo lote; False quando não sobra nenhum depois dele
+        batch = self.pending if self.batch_count else next(self.batches, None)
+        if batch is not None:
+            # Lotes seguintes entram no mesmo passo de desfazer do primeiro
+            if self.batch_count:
+                self.cursor.joinPreviousEditBlock()
+                self.cursor.insertText('\n' + batch)
+            else:
+                self.cursor.beginEditBlock()
+                self.cursor.insertText(batch)
+            self.cursor.endEditBlock()
+            self.batch_count += 1
+            # Já buscar o próximo lote para encerrar sem esperar mais uma volta do timer
+            self.pending = next(self.batches, None)
+        return batch is not None and self.pending is not None
+
+    def complete(self):
+        # Inserir de uma vez os lotes que faltam
+        if self.running:
+            while self.insert_batch():
+                pass
+            self.finish()
+
+    def cancel(self):
+        # Parar sem inserir os lotes que faltam (os já inseridos ficam)
+        if self.running:
+            self.finish()
+
+    def finish(self):
+        self.running = False
+        self.edit.setReadOnly(False)
+        self.edit.blockSignals(self.signals_blocked)
+        self.edit.setTextCursor(self.cursor)
+        if self.on_finished:
+            self.on_finished()
@@ -1,18 +1,33 @@
 # dialog.py
 
+import csv
 import json
 import os
-import shutil
 import re
 import urllib.parse
-import base64
-from aqt import mw
+from aqt import mw, gui_hooks
 from aqt.qt import *
 from aqt.utils import showInfo, showWarning
 from aqt.webview import QWebEngineView
+from aqt.operations import CollectionOp
 from anki.utils import strip_html
+from .bulk_add import BulkAddJob
+from .chunked_paste import ChunkedPaste, iter_excel_lines
+from .card_parser import parse_cards
+from .duplicates import DuplicateIndexCache, DUPLICATE_POLICIES, DUPLICATE_SKIP
+from .file_import import FileImportError, iter_cards
 from .highlighter import HtmlTagHighlighter
+from .html_sanitizer import clean_raw_html
+from .import_dialog import FileImportDialog
+from .line_sync import TagsLineSync
+from .media_index import MediaReferenceIndex
+from .media_ingest import IngestJob, numbered_name
+from .image_optimizer import ImageOptimizer, DEFAULT_MAX_DIMENSION, DEFAULT_FORMAT, DEFAULT_QUALITY
+from .markdown_tables import convert_markdown_to_html
 from .media_manager import MediaManagerDialog
+from .name_list import NameList
+from .notetypes import NotetypeCache
+from .preview import PreviewEngine, PreviewScheduler, DEFAULT_PREVIEW_DELAY_MS, media_base_url
 from .visualizar import VisualizarCards
 from .utils import CONFIG_FILE
 
@@ -28,10 +43,22 @@ class CustomDialog(QDialog):
         self.initial_numbering_set = False
         self.media_files = []  # Lista para armazenar arquivos de mídia adicionados
         self.current_line = 0  # Para rastrear a linha atual
-        self.previous_text = ""  # Para rastrear o texto anterior e detectar mudanças nos nomes de mídia
         self.last_edited_line = -1  # Para rastrear a última linha editada
+        self.add_job = None  # Adição de cards em segundo plano (BulkAddJob) em andamento
+        self.paste_job = None  # Colagem em lotes (ChunkedPaste) em andamento
+        self.duplicate_cache = DuplicateIndexCache()  # Primeiros campos já existentes no tipo de nota
+        self.notetypes = NotetypeCache()  # Campos e dados dos tipos de nota, por id e mtime
+        # Otimização das imagens ao entrar na pasta de mídia (config.json)
+        self.imagem_dimensao_max = DEFAULT_MAX_DIMENSION
+        self.imagem_formato = DEFAULT_FORMAT
+        self.imagem_qualidade = DEFAULT_QUALITY
+        self.bytes_economizados = 0
         self.setup_ui()
         self.load_settings()
+        self.update_highlighter()
+        self.record_savings(0)
+        # Listas de decks/tipos de nota relidas só quando eles mudam
+        gui_hooks.operation_did_execute.append(self.on_operation_did_execute)
 
     def setup_ui(self):
         self.setWindowTitle("Adicionar Cards com Delimitadores")
@@ -99,7 +126,8 @@ class CustomDialog(QDialog):
         self.txt_entrada = QTextEdit()
         self.txt_entrada.setPlaceholderText("Digite seus cards aqui...")
         self.highlighter = HtmlTagHighlighter(self.txt_entrada.document())
-        self.txt_entrada.textChanged.connect(self.update_tags_lines)  # Sincronizar linhas com o campo de etiquetas
+        self.media_index = MediaReferenceIndex(self.txt_entrada.document())  # Referências de mídia por linha
+        self.txt_entrada.textChanged.connect(self.update_preview)
         self.txt_entrada.cursorPositionChanged.connect(self.check_line_change)  # Verificar mudança de linha
         self.txt_entrada.focusOutEvent = self.focus_out_event  # Detectar perda de foco
         cards_layout.addWidget(self.txt_entrada)
@@ -119,6 +147,9 @@ class CustomDialog(QDialog):
         self.txt_tags.setMaximumWidth(200)
         self.txt_tags.textChanged.connect(self.update_preview)  # Atualizar pré-visualização ao mudar tags
         etiquetas_layout.addWidget(self.txt_tags)
+        self.tags_sync = TagsLineSync(self.txt_entrada.document(), self.txt_tags)  # Sincronizar linhas com o campo de etiquetas
+        self.preview_engine = PreviewEngine(self.txt_entrada.document(), self.txt_tags.document())
+        self.preview_scheduler = PreviewScheduler(self.render_preview, DEFAULT_PREVIEW_DELAY_MS, self)
         self.etiquetas_group.setVisible(False)  # Escondido por padrão
         cards_tags_layout.addWidget(self.etiquetas_group, stretch=1)
         
@@ -147,6 +178,16 @@ class CustomDialog(QDialog):
         self.chk_repetir_tags.stateChanged.connect(self.update_repeated_tags)
         options_layout.addWidget(self.chk_num_tags)
         options_layout.addWidget(self.chk_repetir_tags)
+        self.chk_otimizar_imagens = QCheckBox("Otimizar Imagens")
+        options_layout.addWidget(self.chk_otimizar_imagens)
+        
+        # O que fazer com cards cujo primeiro campo já existe no tipo de nota
+        options_layout.addWidget(QLabel("Duplicados:"))
+        self.combo_duplicados = QComboBox()
+        for valor, nome in DUPLICATE_POLICIES:
+            self.combo_duplicados.addItem(nome, valor)
+        self.combo_duplicados.setToolTip("Pular, atualizar a nota existente (só campos e tags que mudaram, mantendo o agendamento) ou adicionar mesmo assim os cards cujo primeiro campo já existe no tipo de nota")
+        options_layout.addWidget(self.combo_duplicados)
         
         # Botão para mostrar/ocultar etiquetas
         self.toggle_tags_button = QPushButton("Mostrar Etiquetas", self)
@@ -233,7 +274,7 @@ class CustomDialog(QDialog):
         # Widget para "Decks"
         decks_group = QGroupBox("Decks")
         decks_layout = QVBoxLayout(decks_group)
-        self.scroll_decks, self.lista_decks = self.criar_lista_rolavel([d.name for d in mw.col.decks.all_names_and_ids()], 100)
+        self.scroll_decks, self.lista_decks = self.criar_lista_rolavel(lambda: [d.name for d in mw.col.decks.all_names_and_ids()], 100)
         decks_layout.addWidget(self.scroll_decks)
         self.decks_search_input = QLineEdit(self)
         self.decks_search_input.setPlaceholderText("Pesquisar decks...")
@@ -253,8 +294,8 @@ class CustomDialog(QDialog):
         # Widget para "Modelos"
         modelos_group = QGroupBox("Modelos ou Tipos de Notas")
         modelos_layout = QVBoxLayout(modelos_group)
-        self.scroll_notetypes, self.lista_notetypes = self.criar_lista_rolavel(mw.col.models.all_names(), 100)
-        self.lista_notetypes.currentItemChanged.connect(self.update_preview)  # Atualizar pré-visualização ao mudar tipo de nota
+        self.scroll_notetypes, self.lista_notetypes = self.criar_lista_rolavel(lambda: mw.col.models.all_names(), 100)
+        self.lista_notetypes.selectionModel().currentChanged.connect(self.update_preview)  # Atualizar pré-visualização ao mudar tipo de nota
         modelos_layout.addWidget(self.scroll_notetypes)
         self.notetypes_search_input = QLineEdit(self)
         self.notetypes_search_input.setPlaceholderText("Pesquisar tipos de notas...")
@@ -285,6 +326,7 @@ class CustomDialog(QDialog):
             chk = QCheckBox(nome)
             chk.simbolo = simbolo
             chk.stateChanged.connect(self.update_preview)  # Atualizar pré-visualização ao mudar delimitadores
+            chk.stateChanged.connect(self.update_highlighter)  # Destacar apenas os delimitadores marcados
             grid.addWidget(chk, i // 4, i % 4)
             self.chk_delimitadores[nome] = chk
         delimitadores_layout.addLayout(grid)
@@ -305,10 +347,14 @@ class CustomDialog(QDialog):
         self.btn_toggle = QPushButton("Ocultar Decks/Modelos/Delimitadores")
         self.btn_toggle.clicked.connect(self.toggle_group)
         bottom_buttons_layout.addWidget(self.btn_toggle)
-        btn_add = QPushButton("Adicionar Cards (Ctrl+R)")
-        btn_add.clicked.connect(self.add_cards)
-        btn_add.setToolTip("Adicionar Cards (Ctrl+R)")
-        bottom_buttons_layout.addWidget(btn_add)
+        self.btn_add = QPushButton("Adicionar Cards (Ctrl+R)")
+        self.btn_add.clicked.connect(self.add_cards)
+        self.btn_add.setToolTip("Adicionar Cards (Ctrl+R)")
+        bottom_buttons_layout.addWidget(self.btn_add)
+        self.btn_import = QPushButton("Importar Arquivo")
+        self.btn_import.clicked.connect(self.import_file)
+        self.btn_import.setToolTip("Importar CSV/TSV/XLSX direto para o deck, sem passar pelo campo de texto")
+        bottom_buttons_layout.addWidget(self.btn_import)
         bottom_layout.addLayout(bottom_buttons_layout)
         bottom_layout.addStretch()
         
@@ -344,24 +390,14 @@ class CustomDialog(QDialog):
         self.txt_entrada.focusInEvent = self.create_focus_handler(self.txt_entrada, "cards")
         self.txt_tags.focusInEvent = self.create_focus_handler(self.txt_tags, "tags")
 
+    def update_highlighter(self, *args):
+        self.highlighter.set_delimitadores([chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()])
+
     def toggle_tags(self):
         novo_estado = not self.etiquetas_group.isVisible()
         self.etiquetas_group.setVisible(novo_estado)
         self.toggle_tags_button.setText("Ocultar Etiquetas" if novo_estado else "Mostrar Etiquetas")
 
-    def update_tags_lines(self):
-        # Sincronizar o número de linhas no campo de etiquetas com o número de linhas no campo de cards
-        linhas_cards = self.txt_entrada.toPlainText().strip().split('\n')
-        linhas_tags = self.txt_tags.toPlainText().strip().split('\n')
-        
-        # Garantir que o número de linhas no campo de etiquetas seja o mesmo que no campo de cards
-        if len(linhas_tags) < len(linhas_cards):
-            self.txt_tags.setPlainText(self.txt_tags.toPlainText() + '\n' * (len(linhas_cards) - len(linhas_tags)))
-        elif len(linhas_tags) > len(linhas_cards):
-            self.txt_tags.setPlainText('\n'.join(linhas_tags[:len(linhas_cards)]))
-        
-        self.update_preview()
-
     def check_line_change(self):
         # Verificar se a linha atual mudou
         cursor = self.txt_entrada.textCursor()
@@ -370,6 +406,9 @@ class CustomDialog(QDialog):
             self.process_media_rename()
             self.current_line = current_line
             self.last_edited_line = current_line
+            # Navegação explícita para outra linha: renderizar imediatamente
+            self.preview_scheduler.render_now()
+            return
         self.update_preview()
 
     def focus_out_event(self, event):
@@ -378,162 +417,64 @@ class CustomDialog(QDialog):
         QTextEdit.focusOutEvent(self.txt_entrada, event)
 
     def process_media_rename(self):
-        # Detectar mudanças nos nomes de arquivos de mídia e renomear na pasta de mídia
-        current_text = self.txt_entrada.toPlainText()
-        if self.previous_text != current_text:
-            # Padrões para encontrar nomes de arquivos de mídia
-            patterns = [
-                r'<img src="([^"]+)"',
-                r'<source src="([^"]+)"',
-                r'<video src="([^"]+)"'
-            ]
-            
-            # Obter nomes de arquivos de mídia no texto anterior e atual
-            previous_media = set()
-            current_media = set()
-            for pattern in patterns:
-                previous_media.update(re.findall(pattern, self.previous_text))
-                current_media.update(re.findall(pattern, current_text))
-            
-            # Comparar e renomear arquivos
-            media_dir = mw.col.media.dir()
-            for old_name in previous_media:
-                if old_name in self.media_files and old_name not in current_media:
-                    # Procurar o novo nome correspondente
-                    for new_name in current_media:
-                        if new_name not in previous_media and new_name not in self.media_files:
-                            # Verificar se o novo nome já existe
-                            if os.path.exists(os.path.join(media_dir, new_name)):
-                                showWarning(f"O nome '{new_name}' já existe na pasta de mídia!")
-                                continue
-                            
-                            # Renomear o arquivo na pasta de mídia
-                            try:
-                                os.rename(
-                                    os.path.join(media_dir, old_name),
-                                    os.path.join(media_dir, new_name)
-                                )
-                                # Atualizar a lista de mídia
-                                self.media_files[self.media_files.index(old_name)] = new_name
-                                showInfo(f"Arquivo renomeado de '{old_name}' para '{new_name}' na pasta de mídia.")
-                            except Exception as e:
-                                showWarning(f"Erro ao renomear o arquivo: {str(e)}")
-                            break
+        # Detectar mudanças nos nomes de arquivos de mídia e renomear na pasta de mídia.
+        # O índice só reprocessa os blocos alterados; aqui apenas os nomes que
+        # saíram e entraram desde a última verificação são pareados, em ordem.
+        removed, added = self.media_index.take_changes()
+        old_names = [name for name in removed if name in self.media_files]
+        new_names = [name for name in added if name not in self.media_files]
+        if not old_names or not new_names:
+            return
+        media_dir = mw.col.media.dir()
+        for old_name, new_name in zip(old_names, new_names):
+            # Verificar se o novo nome já existe
+            if os.path.exists(os.path.join(media_dir, new_name)):
+                showWarning(f"O nome '{new_name}' já existe na pasta de mídia!")
+                continue
             
-            self.previous_text = current_text
+            # Renomear o arquivo na pasta de mídia
+            try:
+                os.rename(
+                    os.path.join(media_dir, old_name),
+                    os.path.join(media_dir, new_name)
+                )
+                # Atualizar a lista de mídia
+                self.media_files[self.media_files.index(old_name)] = new_name
+                showInfo(f"Arquivo renomeado de '{old_name}' para '{new_name}' na pasta de mídia.")
+            except Exception as e:
+                showWarning(f"Erro ao renomear o arquivo: {str(e)}")
 
-    def update_preview(self):
+    def update_preview(self, *args):
+        # Pedidos de atualização são agrupados pelo agendador (uma renderização por rajada)
+        self.preview_scheduler.request()
+
+    def render_preview(self):
         # Determinar a linha atual com base na posição do cursor
         cursor = self.txt_entrada.textCursor()
         self.current_line = cursor.blockNumber()
-        
-        linhas = self.txt_entrada.toPlainText().strip().split('\n')
-        if not linhas or self.current_line >= len(linhas):
-            self.preview_widget.setHtml("")
-            return
-        
-        # Mostrar apenas a linha atual
-        linha = linhas[self.current_line]
-        if not linha.strip():
-            self.preview_widget.setHtml("")
-            return
-        
+
         delimitadores = [chk.simbolo for chk in self.chk_delimitadores.values() if chk.isChecked()]
-        if not delimitadores or not self.lista_decks.currentItem() or not self.lista_notetypes.currentItem():
-            self.preview_widget.setHtml("")
-            return
-        
-        modelo = mw.col.models.by_name(self.lista_notetypes.currentItem().text())
-        campos = [fld['name'] for fld in modelo['flds']]
-        num_fields = len(campos)
-        
-        # Preparação de tags (uma linha por card)
-        linhas_tags = self.txt_tags.toPlainText().strip().split('\n')
-        tags_for_current_card = []
-        if self.current_line < len(linhas_tags):
-            tags_for_current_card = [tag.strip() for tag in linhas_tags[self.current_line].split(',') if tag.strip()]
-        
-        card_index = self.current_line
-        media_dir = mw.col.media.dir()
+        if not delimitadores or not self.lista_decks.current_name() or not self.lista_notetypes.current_name():
+            html = self.preview_engine.render_blank()
+        else:
+            # Mostrar apenas a linha atual (o motor só reprocessa blocos alterados)
+            self.preview_engine.set_delimitadores(delimitadores)
+            self.preview_engine.set_model(self.current_notetype())
+            self.preview_engine.set_duplicates(self.duplicate_index(self.preview_engine.model_id))
+            html = self.preview_engine.render(self.current_line, self.chk_num_tags.isChecked())
+        if html is not None:
+            self.preview_widget.setHtml(html, media_base_url())
 
-        def get_mime_type(file_name):
-            ext = os.path.splitext(file_name)[1].lower()
-            return {
-                '.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.gif': 'image/gif',
-                '.mp3': 'audio/mpeg', '.wav': 'audio/wav', '.ogg': 'audio/ogg', '.mp4': 'video/mp4',
-                '.webm': 'video/webm'
-            }.get(ext, 'application/octet-stream')
-
-        def replace_media_src(match, media_type="img"):
-            file_name = match.group(1)
-            full_path = os.path.join(media_dir, file_name)
-            if not os.path.exists(full_path):
-                print(f"Arquivo não encontrado: {full_path}")
-                return match.group(0)
-            try:
-                with open(full_path, 'rb') as f:
-                    base64_data = base64.b64encode(f.read()).decode('utf-8')
-                mime_type = get_mime_type(file_name)
-                return f'<{media_type} src="data:{mime_type};base64,{base64_data}"' + (" controls width=\"320\" height=\"240\"" if media_type == "video" else "")
-            except Exception as e:
-                print(f"Erro ao codificar {media_type} em base64: {str(e)}")
-                return match.group(0)
-
-        cards_html = """
-        <html><body style="font-family: Arial, sans-serif; background-color: #f9f9f9; padding: 10px;">
-        <style>
-            table {
-                border-collapse: collapse;
-                width: 100%;
-                margin: 5px 0;
-            }
-            th, td {
-                border: 1px solid #ddd;
-                padding: 8px;
-                text-align: left;
-                vertical-align: top;
-                width: 33%;  /* Distribuir igualmente as colunas */
-                box-sizing: border-box;
-            }
-            th {
-                background-color: #f2f2f2;
-                font-weight: bold;
-            }
-            ul, ol {
-                margin: 5px 0;
-                padding-left: 20px;
-            }
-        </style>
-        """
-        for delim in delimitadores:
-            if delim in linha:
-                partes = linha.split(delim)
-                card_html = """
-                <table style="width: 100%; border-collapse: separate; border-spacing: 0; box-shadow: 0 4px 8px rgba(0,0,0,0.1); border-radius: 8px; margin-bottom: 20px;">
-                """
-                for j, campo in enumerate(partes[:num_fields]):
-                    campo_formatado = campo.strip()
-                    for tag, type_ in [('<img', 'img'), ('<source', 'source'), ('<video', 'video')]:
-                        if tag in campo_formatado:
-                            campo_formatado = re.sub(rf'{tag} src="([^"]+)"', lambda m: replace_media_src(m, type_), campo_formatado)
-                    card_html += f"""
-                    <tr><td style="background-color: #444; color: white; padding: 12px; text-align: center; font-weight: bold; font-size: 16px; border-top-left-radius: 8px; border-top-right-radius: 8px;">{campos[j]}</td></tr>
-                    <tr><td style="padding: 15px; border: 1px solid #ddd; background-color: white; border-bottom-left-radius: 8px; border-bottom-right-radius: 8px;">{campo_formatado}</td></tr>
-                    """
-                card_html += "</table>"
-                
-                if tags_for_current_card:
-                    if self.chk_num_tags.isChecked():
-                        tags_str = ', '.join(f"{tag}{card_index + 1}" for tag in tags_for_current_card)
-                    else:
-                        tags_str = ', '.join(tags_for_current_card)
-                    card_html += f"<p><b>Tags:</b> {tags_str}</p>"
-                
-                cards_html += card_html
-                break
-        
-        cards_html += "</body></html>"
-        self.preview_widget.setHtml(cards_html)
+    def current_notetype(self):
+        # NotetypeInfo do tipo de nota selecionado (None se nenhum)
+        return self.notetypes.get(mw.col, self.lista_notetypes.current_name())
+
+    def duplicate_index(self, mid):
+        # Índice montado uma vez por tipo de nota e refeito só quando a coleção muda
+        return self.duplicate_cache.get(mw.col, mid) if mid else None
+
+    def duplicate_policy(self):
+        return self.combo_duplicados.currentData()
 
     def apply_text_color(self, color):
         cursor = self.txt_entrada.textCursor()
@@ -544,7 +485,7 @@ class CustomDialog(QDialog):
             cursor.insertText(f'<span style="color:{color}"></span>')
             cursor.movePosition(QTextCursor.MoveOperation.Left, QTextCursor.MoveMode.MoveAnchor, 7)
             self.txt_entrada.setTextCursor(cursor)
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def apply_background_color(self, color):
@@ -556,12 +497,16 @@ class CustomDialog(QDialog):
             cursor.insertText(f'<span style="background-color:{color}"></span>')
             cursor.movePosition(QTextCursor.MoveOperation.Left, QTextCursor.MoveMode.MoveAnchor, 7)
             self.txt_entrada.setTextCursor(cursor)
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def add_cards(self):
-        deck = self.lista_decks.currentItem()
-        notetype = self.lista_notetypes.currentItem()
+        self.complete_paste()
+        if self.add_job is not None:
+            showWarning("Já existe uma adição de cards em andamento!")
+            return
+        deck = self.lista_decks.current_name()
+        notetype = self.lista_notetypes.current_name()
         if not deck or not notetype:
             showWarning("Selecione um deck e um modelo!")
             return
@@ -569,69 +514,112 @@ class CustomDialog(QDialog):
         if not delimitadores:
             showWarning("Selecione pelo menos um delimitador!")
             return
-        linhas = self.txt_entrada.toPlainText().strip().split('\n')
-        if not linhas:
+        if not self.txt_entrada.toPlainText().strip():
             showWarning("Digite algum conteúdo!")
             return
-        modelo = mw.col.models.by_name(notetype.text())
-        num_fields = len(modelo['flds'])
-        contador = 0
+        # Tipo de nota (do cache) e deck resolvidos uma única vez para todo o lote
+        info = self.current_notetype()
+        deck_id = mw.col.decks.by_name(deck)['id']
         
-        # Tags (uma linha por card)
-        linhas_tags = self.txt_tags.toPlainText().strip().split('\n')
+        # Tags (uma linha por card), numeradas pelo parser se "Numerar Tags" estiver marcado
+        cards = parse_cards(self.txt_entrada.toPlainText(), self.txt_tags.toPlainText(), delimitadores, len(info.fields), self.chk_num_tags.isChecked())
+        if not cards:
+            showWarning("Nenhum card válido para adicionar!")
+            return
         
-        card_index = 0
+        # Inserir em segundo plano, com progresso e possibilidade de cancelar
+        self.run_add_job(BulkAddJob(info.model, deck_id, cards, self.duplicate_policy()))
+
+    def import_file(self):
+        # Importar CSV/TSV/XLSX direto para a inserção em lote, sem passar pelo campo de texto
+        if self.add_job is not None:
+            showWarning("Já existe uma adição de cards em andamento!")
+            return
+        deck = self.lista_decks.current_name()
+        notetype = self.lista_notetypes.current_name()
+        if not deck or not notetype:
+            showWarning("Selecione um deck e um modelo!")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Importar Arquivo", "", "Planilhas (*.csv *.tsv *.txt *.xlsx)")
+        if not path:
+            return
+        info = self.current_notetype()
+        deck_id = mw.col.decks.by_name(deck)['id']
+        try:
+            dialog = FileImportDialog(self, path, info.fields)
+        except (OSError, UnicodeDecodeError, csv.Error, FileImportError) as e:
+            showWarning(f"Erro ao ler o arquivo: {str(e)}")
+            return
+        if not dialog.exec():
+            return
+        # O arquivo é lido lote a lote pela própria inserção em segundo plano
+        self.run_add_job(BulkAddJob(info.model, deck_id, iter_cards(path, dialog.mapping()), self.duplicate_policy()))
+
+    def run_add_job(self, job):
+        # O CollectionOp abre a janela de progresso do Anki (modal): o progresso
+        # aparece nela e o Cancelar/Esc dela interrompe a adição após o lote atual
+        self.add_job = job
+        self.btn_add.setEnabled(False)
+        self.btn_import.setEnabled(False)
         
-        for i, linha in enumerate(linhas):
-            if not linha.strip():
-                continue
-                
-            for delim in delimitadores:
-                if delim in linha:
-                    partes = linha.split(delim)
-                    nota = mw.col.new_note(modelo)
-                    for j in range(min(len(partes), num_fields)):
-                        nota.fields[j] = partes[j].strip()
-                    
-                    # Aplicar tags específicas para este card
-                    tags_for_card = []
-                    if i < len(linhas_tags):
-                        tags_for_card = [tag.strip() for tag in linhas_tags[i].split(',') if tag.strip()]
-                    if tags_for_card:
-                        if self.chk_num_tags.isChecked():
-                            nota.tags.extend([f"{tag}{card_index + 1}" for tag in tags_for_card])
-                        else:
-                            nota.tags.extend(tags_for_card)
-                    
-                    try:
-                        mw.col.add_note(nota, mw.col.decks.by_name(deck.text())['id'])
-                        contador += 1
-                        card_index += 1
-                    except Exception as e:
-                        print(f"Erro ao adicionar card: {str(e)}")
-                    break
+        def on_progress(added, total):
+            # Chamado em segundo plano entre um lote e outro
+            if mw.progress.want_cancel():
+                job.cancel()
+            label = f"{added} / {total} cards" if total is not None else f"{added} cards"
+            mw.taskman.run_on_main(lambda: mw.progress.update(label=label, value=added, max=total or 0))
         
-        showInfo(f"{contador} cards adicionados com sucesso!")
+        CollectionOp(
+            parent=self,
+            op=lambda col: job.run(col, on_progress),
+        ).success(
+            lambda changes: self.finish_add_cards(job)
+        ).failure(
+            lambda exc: self.finish_add_cards(job, exc)
+        ).run_in_background()
+
+    def cancel_add_cards(self):
+        if self.add_job is not None:
+            self.add_job.cancel()
+
+    def finish_add_cards(self, job, exc=None):
+        self.add_job = None
+        self.btn_add.setEnabled(True)
+        self.btn_import.setEnabled(True)
+        total = job.total if job.total is not None else "?"
+        # Duplicados pulados ou atualizados
+        resumo = ""
+        if job.skipped:
+            resumo += f"\n{job.skipped} duplicados pulados."
+        if job.updated:
+            resumo += f"\n{job.updated} notas existentes atualizadas."
+        if job.unchanged:
+            resumo += f"\n{job.unchanged} notas existentes sem alterações."
+        if exc is not None:
+            showWarning(f"Erro ao adicionar cards: {str(exc)}\n\n{job.added} de {total} cards foram adicionados antes do erro.{resumo}")
+        elif job.cancelled and (job.total is None or job.processed < job.total):
+            showInfo(f"Adição cancelada: {job.added} de {total} cards foram adicionados.{resumo}")
+        else:
+            showInfo(f"{job.added} cards adicionados com sucesso!{resumo}")
 
     def add_image(self):
         arquivos, _ = QFileDialog.getOpenFileNames(self, "Selecionar Arquivos", "", "Mídia (*.png *.jpg *.jpeg *.gif *.mp3 *.wav *.ogg *.mp4 *.webm)")
         if arquivos:
-            media_dir = mw.col.media.dir()
-            for caminho in arquivos:
-                nome = os.path.basename(caminho)
-                destino = os.path.join(media_dir, nome)
-                if not os.path.exists(destino):
-                    shutil.copy(caminho, destino)
-                self.media_files.append(nome)  # Adicionar à lista de arquivos de mídia
-                ext = os.path.splitext(nome)[1].lower()
-                if ext in ('.png', '.jpg', '.jpeg', '.gif'):
-                    self.txt_entrada.insertPlainText(f'<img src="{nome}">\n')
-                elif ext in ('.mp3', '.wav', '.ogg'):
-                    self.txt_entrada.insertPlainText(f'<audio controls=""><source src="{nome}" type="audio/mpeg"></audio>\n')
-                elif ext in ('.mp4', '.webm'):
-                    self.txt_entrada.insertPlainText(f'<video src="{nome}" controls width="320" height="240"></video>\n')
-            self.previous_text = self.txt_entrada.toPlainText()
-            self.update_preview()
+            self.process_files(arquivos)
+
+    def image_optimizer(self):
+        # None quando "Otimizar Imagens" está desmarcado (arquivos copiados sem alteração)
+        if not self.chk_otimizar_imagens.isChecked():
+            return None
+        return ImageOptimizer(self.imagem_dimensao_max, self.imagem_formato, self.imagem_qualidade)
+
+    def record_savings(self, saved_bytes):
+        self.bytes_economizados += max(0, saved_bytes)
+        self.chk_otimizar_imagens.setToolTip(
+            f"Reduz imagens maiores que {self.imagem_dimensao_max}px e regrava capturas de tela em "
+            f"{self.imagem_formato.upper()} (qualidade {self.imagem_qualidade}), sem metadados.\n"
+            f"Economia total: {self.bytes_economizados / 1024 / 1024:.1f} MB"
+        )
 
     def drag_enter_event(self, event):
         if event.mimeData().hasUrls():
@@ -643,30 +631,32 @@ class CustomDialog(QDialog):
             file_paths = [url.toLocalFile() for url in mime_data.urls()]
             self.process_files(file_paths)
             event.acceptProposedAction()
-        self.previous_text = self.txt_entrada.toPlainText()
-        self.update_preview()
 
     def process_files(self, file_paths):
-        media_folder = mw.col.media.dir()
-        for file_path in file_paths:
-            file_name = os.path.basename(file_path)
-            new_path = os.path.join(media_folder, file_name)
-            if os.path.exists(new_path):
-                base_name, ext = os.path.splitext(file_name)
-                counter = 1
-                while os.path.exists(new_path):
-                    file_name = f"{base_name}{counter}{ext}"
-                    new_path = os.path.join(media_folder, file_name)
-                    counter += 1
-            shutil.copy(file_path, new_path)
-            self.media_files.append(file_name)  # Adicionar à lista de arquivos de mídia
-            ext = file_name.lower()
-            if ext.endswith(('.png', '.xpm', '.jpg', '.jpeg', '.bmp', '.gif')):
-                self.txt_entrada.insertPlainText(f'<img src="{file_name}">\n')
-            elif ext.endswith(('.mp3', '.wav', '.ogg')):
-                self.txt_entrada.insertPlainText(f'<audio controls=""><source src="{file_name}" type="audio/mpeg"></audio>\n')
-            elif ext.endswith(('.mp4', '.webm', '.avi', '.mkv', '.mov')):
-                self.txt_entrada.insertPlainText(f'<video src="{file_name}" controls width="320" height="240"></video>\n')
+        # Copiar em segundo plano (hash + cópias em paralelo) e inserir as tags de uma vez no final
+        job = IngestJob(mw.col.media.dir(), file_paths, self.image_optimizer())
+        if not job.total:
+            return
+        # O QTextCursor acompanha as edições feitas enquanto os arquivos são copiados
+        cursor = self.txt_entrada.textCursor()
+
+        def on_progress(done, total):
+            mw.taskman.run_on_main(lambda: mw.progress.update(label=f"Copiando mídia: {done} / {total}", value=done, max=total))
+
+        def on_done(future):
+            try:
+                future.result()
+            except Exception as e:
+                showWarning(f"Erro ao copiar os arquivos de mídia: {str(e)}")
+                return
+            # Adicionar à lista de arquivos de mídia
+            self.media_files.extend(name for name in dict.fromkeys(job.names) if name not in self.media_files)
+            self.record_savings(job.saved_bytes)
+            cursor.insertText(job.tags())
+            self.media_index.clear_changes()
+            self.update_preview()
+
+        mw.taskman.with_progress(lambda: job.run(on_progress), on_done, label="Copiando mídia...", parent=self)
 
     def show_context_menu(self, pos):
         menu = self.txt_entrada.createStandardContextMenu()
@@ -683,92 +673,11 @@ class CustomDialog(QDialog):
 
 
     def convert_markdown_to_html(self, text):
-        # Detectar tabelas Markdown e convertê-las para HTML
-        lines = text.split('\n')
-        table_html = ""
-        in_table = False
-        headers = []
-        rows = []
-        table_start_idx = -1
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Detectar uma linha de tabela Markdown (ex.: | Coluna 1 | Coluna 2 |)
-            if line.startswith('|') and line.endswith('|') and '|' in line[1:-1]:
-                cells = [cell.strip() for cell in line[1:-1].split('|')]
-                # Verificar se a próxima linha é uma linha de separação (ex.: | --- | --- |)
-                if not in_table and i + 1 < len(lines) and re.match(r'^\|(?:\s*[-:]+(?:\s*\|)?)+$', lines[i + 1]):
-                    in_table = True
-                    table_start_idx = i
-                    headers = cells
-                    continue
-                elif in_table:
-                    rows.append(cells)
-            elif in_table:
-                # Fim da tabela, converter para HTML
-                if headers and rows:
-                    table_html += "<table>\n<thead>\n<tr>"
-                    for header in headers:
-                        table_html += f"<th>{header}</th>"
-                    table_html += "</tr>\n</thead>\n<tbody>\n"
-                    for row in rows:
-                        while len(row) < len(headers):
-                            row.append("")
-                        table_html += "<tr>"
-                        for cell in row[:len(headers)]:
-                            table_html += f"<td>{cell}</td>"
-                        table_html += "</tr>\n"
-                    table_html += "</tbody>\n</table>"
-                in_table = False
-                headers = []
-                rows = []
-        
-        # Se ainda estamos em uma tabela no final do texto
-        if in_table and headers and rows:
-            table_html += "<table>\n<thead>\n<tr>"
-            for header in headers:
-                table_html += f"<th>{header}</th>"
-            table_html += "</tr>\n</thead>\n<tbody>\n"
-            for row in rows:
-                while len(row) < len(headers):
-                    row.append("")
-                table_html += "<tr>"
-                for cell in row[:len(headers)]:
-                    table_html += f"<td>{cell}</td>"
-                table_html += "</tr>\n"
-            table_html += "</tbody>\n</table>"
-        
-        # Substituir a tabela Markdown pelo HTML gerado
-        if table_html:
-            # Remover as linhas da tabela Markdown original
-            new_lines = []
-            in_table = False
-            for i, line in enumerate(lines):
-                if i == table_start_idx:
-                    in_table = True
-                    continue
-                elif in_table and (line.strip().startswith('|') and line.strip().endswith('|') and '|' in line.strip()[1:-1] or re.match(r'^\|(?:\s*[-:]+(?:\s*\|)?)+$', line)):
-                    continue
-                else:
-                    in_table = False
-                    if line.strip():  # Só adicionar linhas não vazias
-                        new_lines.append(line.rstrip())
-            
-            # Juntar as linhas restantes e adicionar a tabela HTML
-            remaining_text = '\n'.join(new_lines).rstrip()
-            if remaining_text:
-                text = remaining_text + '\n' + table_html.rstrip()
-            else:
-                text = table_html.rstrip()
-        else:
-            # Se não houver tabela, apenas remover linhas em branco extras
-            text = '\n'.join(line.rstrip() for line in lines if line.strip()).rstrip()
-        return text
+        # Detectar tabelas Markdown e convertê-las para HTML, cada uma no seu lugar
+        return convert_markdown_to_html(text)
 
     def paste_html(self):
+        self.complete_paste()
         clipboard = QApplication.clipboard()
         mime_data = clipboard.mimeData()
         if mime_data.hasHtml():
@@ -782,14 +691,24 @@ class CustomDialog(QDialog):
             image = clipboard.image()
             if not image.isNull():
                 media_folder = mw.col.media.dir()
-                base_name, ext, counter = "img", ".png", 1
-                file_name = f"{base_name}{counter}{ext}"
+                data, ext = None, ".png"
+                optimizer = self.image_optimizer()
+                if optimizer:
+                    # Usar a versão otimizada só se ficar menor que o PNG que seria gravado
+                    png = QBuffer()
+                    png.open(QIODevice.OpenModeFlag.WriteOnly)
+                    image.save(png, 'PNG')
+                    optimized = optimizer.encode(image)
+                    if optimized and len(optimized) < png.size():
+                        data, ext = optimized, optimizer.extension
+                        self.record_savings(png.size() - len(optimized))
+                file_name = numbered_name(media_folder, "img", ext)
                 new_path = os.path.join(media_folder, file_name)
-                while os.path.exists(new_path):
-                    counter += 1
-                    file_name = f"{base_name}{counter}{ext}"
-                    new_path = os.path.join(media_folder, file_name)
-                image.save(new_path)
+                if data:
+                    with open(new_path, 'wb') as f:
+                        f.write(data)
+                else:
+                    image.save(new_path)
                 self.media_files.append(file_name)
                 self.txt_entrada.insertPlainText(f'<img src="{file_name}">\n')
         elif mime_data.hasText():
@@ -799,66 +718,47 @@ class CustomDialog(QDialog):
             self.txt_entrada.insertPlainText(text)
         else:
             showWarning("Nenhuma imagem, texto ou HTML encontrado na área de transferência.")
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
 
     def paste_excel(self):
+        if self.paste_job is not None and self.paste_job.running:
+            showWarning("Aguarde a colagem anterior terminar.")
+            return
         clipboard = QApplication.clipboard()
         mime_data = clipboard.mimeData()
         if mime_data.hasText():
-            text = clipboard.text()
-            # Dividir o texto em linhas
-            lines = text.strip().split('\n')
-            formatted_lines = []
-            for line in lines:
-                # Dividir cada linha em colunas usando tabulação (\t) como delimitador
-                columns = line.split('\t')
-                # Remover espaços em branco e juntar as colunas com ponto e vírgula
-                columns = [col.strip() for col in columns]
-                formatted_line = ' ; '.join(columns)
-                formatted_lines.append(formatted_line)
-            # Juntar as linhas formatadas com quebras de linha
-            formatted_text = '\n'.join(formatted_lines)
-            self.txt_entrada.insertPlainText(formatted_text)
-            self.previous_text = self.txt_entrada.toPlainText()
-            self.update_preview()
+            # Linhas convertidas sob demanda e inseridas em lotes; a pré-visualização
+            # volta a ser atualizada só no final
+            self.paste_job = ChunkedPaste(self.txt_entrada, iter_excel_lines(clipboard.text()), self.finish_paste)
+            self.paste_job.start()
         else:
             showWarning("Nenhum texto encontrado na área de transferência para colar como Excel.")
 
+    def complete_paste(self):
+        # Ações que leem ou reescrevem o texto inteiro não podem ver uma colagem
+        # em lotes pela metade: os lotes que faltam são inseridos na hora
+        if self.paste_job is not None:
+            self.paste_job.complete()
+
+    def finish_paste(self):
+        self.media_index.clear_changes()
+        self.current_line = self.txt_entrada.textCursor().blockNumber()
+        self.update_preview()
+
+
 
+    def clean_raw_html(self, html):
+        # Manter só as tags permitidas (inline, listas, tabelas), uma linha por card
+        return clean_raw_html(html)
 
     def paste_raw_html(self):
+        self.complete_paste()
         clipboard = QApplication.clipboard()
         mime_data = clipboard.mimeData()
         if mime_data.hasHtml():
-            html = mime_data.html()
-            # Lista de tags estruturais ou desnecessárias a serem removidas
-            tags_to_remove = [
-                'html', 'body', 'head', 'meta', 'link', 'script', 'style',
-                'title', 'doctype', '!DOCTYPE', 'br', 'hr', 'div', 'p', 'form', 'input', 'button', 'a'
-            ]
-            # Remover tags desnecessárias, mas preservar tags de formatação inline, listas e tabelas
-            pattern = r'</?(?:' + '|'.join(tags_to_remove) + r')(?:\s+[^>]*)?>'
-            cleaned_html = re.sub(pattern, '', html, flags=re.IGNORECASE)
-            # Converter Markdown para HTML (ex.: tabelas)
-            cleaned_html = self.convert_markdown_to_html(cleaned_html)
-            # Proteger o conteúdo dentro de listas e tabelas
-            def protect_structures(match):
-                return match.group(0).replace('\n', ' PROTECTED_NEWLINE ')
-            cleaned_html = re.sub(r'<ul>.*?</ul>|<ol>.*?</ol>|<li>.*?</li>|<table>.*?</table>', protect_structures, cleaned_html, flags=re.DOTALL)
-            # Não adicionar <br> automaticamente; confiar na formatação natural dos elementos
-            lines = cleaned_html.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                line = line.strip()
-                if line:
-                    cleaned_lines.append(line)
-            cleaned_html = '\n'.join(cleaned_lines)
-            # Restaurar quebras de linha dentro de listas e tabelas
-            cleaned_html = cleaned_html.replace(' PROTECTED_NEWLINE ', '\n')
-            # Remover espaços extras, mas preservar espaços dentro de tags
-            cleaned_html = re.sub(r'\s+(?![^<]*>)', ' ', cleaned_html).strip()
+            cleaned_html = self.clean_raw_html(mime_data.html())
             self.txt_entrada.insertPlainText(cleaned_html)
         elif mime_data.hasText():
             text = clipboard.text()
@@ -867,7 +767,7 @@ class CustomDialog(QDialog):
             self.txt_entrada.insertPlainText(text)
         else:
             showWarning("Nenhum texto ou HTML encontrado na área de transferência.")
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def eventFilter(self, obj, event):
@@ -877,13 +777,12 @@ class CustomDialog(QDialog):
                 return True
         return super().eventFilter(obj, event)
 
-    def criar_lista_rolavel(self, itens, altura_min=100):
+    def criar_lista_rolavel(self, load_names, altura_min=100):
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
         scroll.setMinimumHeight(altura_min)
         scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        lista = QListWidget()
-        lista.addItems(itens)
+        lista = NameList(load_names)
         scroll.setWidget(lista)
         return scroll, lista
 
@@ -899,31 +798,15 @@ class CustomDialog(QDialog):
         self.scroll_notetypes.updateGeometry()
 
     def scan_media_files_from_text(self):
-        # Padrões para encontrar nomes de arquivos de mídia no texto
-        patterns = [
-            r'<img src="([^"]+)"',
-            r'<source src="([^"]+)"',
-            r'<video src="([^"]+)"'
-        ]
-        
-        current_text = self.txt_entrada.toPlainText()
+        # Arquivos de mídia mencionados no texto, já conhecidos pelo índice de referências
         media_dir = mw.col.media.dir()
-        found_media = set()
-    
-        # Procurar por todos os arquivos de mídia mencionados no texto
-        for pattern in patterns:
-            matches = re.findall(pattern, current_text)
-            for file_name in matches:
-                # Verificar se o arquivo existe na pasta de mídia
-                file_path = os.path.join(media_dir, file_name)
-                if os.path.exists(file_path) and file_name not in self.media_files:
-                    found_media.add(file_name)
-    
-        # Adicionar os arquivos encontrados à lista self.media_files
-        self.media_files.extend(found_media)
-        self.media_files = list(dict.fromkeys(self.media_files))  # Remover duplicatas, mantendo a ordem
+        for file_name in self.media_index.names():
+            # Verificar se o arquivo existe na pasta de mídia
+            if file_name not in self.media_files and os.path.exists(os.path.join(media_dir, file_name)):
+                self.media_files.append(file_name)
 
     def update_tag_numbers(self):
+        self.complete_paste()
         linhas_tags = self.txt_tags.toPlainText().strip().split('\n')
         num_linhas_cards = len(self.txt_entrada.toPlainText().strip().splitlines())
         
@@ -958,6 +841,7 @@ class CustomDialog(QDialog):
         self.update_preview()
 
     def update_repeated_tags(self):
+        self.complete_paste()
         if self.chk_repetir_tags.isChecked() and not self.initial_tags_set:
             linhas_tags = self.txt_tags.toPlainText().strip().split('\n')
             num_cards = len(self.txt_entrada.toPlainText().strip().splitlines())
@@ -1019,9 +903,10 @@ class CustomDialog(QDialog):
                     break
         if not found:
             showWarning(f"Texto '{search_query}' não encontrado.")
-        self.update_preview()
+        self.preview_scheduler.render_now()
 
     def replace_text(self):
+        self.complete_paste()
         search_query = self.search_input.text().strip()
         replace_text = self.replace_input.text().strip()
         if not search_query:
@@ -1030,7 +915,7 @@ class CustomDialog(QDialog):
         full_text = self.txt_entrada.toPlainText()
         replaced_text = re.sub(re.escape(search_query), replace_text, full_text, flags=re.IGNORECASE)
         self.txt_entrada.setPlainText(replaced_text)
-        self.previous_text = replaced_text
+        self.media_index.clear_changes()
         self.update_preview()
         showInfo(f"Todas as ocorrências de '{search_query}' foram {'substituídas por ' + replace_text if replace_text else 'removidas'}.")
 
@@ -1045,8 +930,7 @@ class CustomDialog(QDialog):
             return
         try:
             mw.col.decks.id(deck_name)
-            self.lista_decks.clear()
-            self.lista_decks.addItems([d.name for d in mw.col.decks.all_names_and_ids()])
+            self.lista_decks.refresh()
             self.deck_name_input.clear()
             showInfo(f"Deck '{deck_name}' criado com sucesso!")
         except Exception as e:
@@ -1057,19 +941,21 @@ class CustomDialog(QDialog):
             self.txt_entrada.zoomOut(1)
             self.zoom_factor -= 0.1
 
-    def filter_list(self, list_widget, search_input, full_list):
-        search_text = search_input.text().strip().lower()
-        filtered = [item for item in full_list if search_text in item.lower()]
-        list_widget.clear()
-        list_widget.addItems(filtered)
-        if filtered and search_text:
-            list_widget.setCurrentRow(0)
-
     def filter_decks(self):
-        self.filter_list(self.lista_decks, self.decks_search_input, [d.name for d in mw.col.decks.all_names_and_ids()])
+        self.lista_decks.set_filter(self.decks_search_input.text())
 
     def filter_notetypes(self):
-        self.filter_list(self.lista_notetypes, self.notetypes_search_input, mw.col.models.all_names())
+        self.lista_notetypes.set_filter(self.notetypes_search_input.text())
+
+    def on_operation_did_execute(self, changes, handler):
+        # Decks ou tipos de nota criados, renomeados ou apagados (aqui ou em outra janela do Anki)
+        if changes.deck:
+            self.lista_decks.refresh()
+        if changes.notetype:
+            self.notetypes.invalidate()
+            self.lista_notetypes.refresh()
+            self.preview_engine.invalidate()
+            self.update_preview()
 
     def create_focus_handler(self, widget, field_type):
         def focus_in_event(event):
@@ -1082,13 +968,14 @@ class CustomDialog(QDialog):
         return focus_in_event
 
     def concatenate_text(self):
+        self.complete_paste()
         clipboard = QApplication.clipboard()
         copied_text = clipboard.text().strip().split("\n")
         current_widget = self.txt_entrada if self.txt_entrada.styleSheet() else self.txt_tags if self.txt_tags.styleSheet() else self.txt_entrada
         current_text = current_widget.toPlainText().strip().split("\n")
         result_lines = [f"{current_text[i] if i < len(current_text) else ''}{copied_text[i] if i < len(copied_text) else ''}".strip() for i in range(max(len(current_text), len(copied_text)))]
         current_widget.setPlainText("\n".join(result_lines))
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def add_cloze_1(self):
@@ -1098,7 +985,7 @@ class CustomDialog(QDialog):
             showWarning("Por favor, selecione uma palavra para adicionar o cloze.")
             return
         cursor.insertText(f"{{{{c1::{selected_text}}}}}")
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def add_cloze_2(self):
@@ -1109,12 +996,13 @@ class CustomDialog(QDialog):
             return
         cursor.insertText(f"{{{{c{self.cloze_2_count}::{selected_text}}}}}")
         self.cloze_2_count += 1
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def remove_cloze(self):
+        self.complete_paste()
         self.txt_entrada.setPlainText(re.sub(r'{{c\d+::(.*?)}}', r'\1', self.txt_entrada.toPlainText()))
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def load_settings(self):
@@ -1122,30 +1010,59 @@ class CustomDialog(QDialog):
             with open(CONFIG_FILE) as f:
                 dados = json.load(f)
                 self.txt_entrada.setPlainText(dados.get('conteudo', ''))
-                self.previous_text = self.txt_entrada.toPlainText()
+                self.media_index.clear_changes()
                 self.txt_tags.setPlainText(dados.get('tags', ''))
+                self.preview_scheduler.set_delay(dados.get('preview_delay_ms', DEFAULT_PREVIEW_DELAY_MS))
+                self.chk_otimizar_imagens.setChecked(dados.get('otimizar_imagens', False))
+                self.imagem_dimensao_max = dados.get('imagem_dimensao_max', DEFAULT_MAX_DIMENSION)
+                self.imagem_formato = dados.get('imagem_formato', DEFAULT_FORMAT)
+                self.imagem_qualidade = dados.get('imagem_qualidade', DEFAULT_QUALITY)
+                self.bytes_economizados = dados.get('bytes_economizados', 0)
+                self.combo_duplicados.setCurrentIndex(max(0, self.combo_duplicados.findData(dados.get('duplicados', DUPLICATE_SKIP))))
                 for nome, estado in dados.get('delimitadores', {}).items():
                     if nome in self.chk_delimitadores:
                         self.chk_delimitadores[nome].setChecked(estado)
                 for key, lista in [('deck_selecionado', self.lista_decks), ('modelo_selecionado', self.lista_notetypes)]:
                     if dados.get(key):
-                        items = lista.findItems(dados[key], Qt.MatchFlag.MatchExactly)
-                        if items:
-                            lista.setCurrentItem(items[0])
+                        lista.select_name(dados[key])
 
     def closeEvent(self, event):
+        self.complete_paste()
         dados = {
             'conteudo': self.txt_entrada.toPlainText(),
             'tags': self.txt_tags.toPlainText(),
             'delimitadores': {nome: chk.isChecked() for nome, chk in self.chk_delimitadores.items()},
-            'deck_selecionado': self.lista_decks.currentItem().text() if self.lista_decks.currentItem() else '',
-            'modelo_selecionado': self.lista_notetypes.currentItem().text() if self.lista_notetypes.currentItem() else ''
+            'deck_selecionado': self.lista_decks.current_name() or '',
+            'modelo_selecionado': self.lista_notetypes.current_name() or '',
+            'preview_delay_ms': self.preview_scheduler.delay(),
+            'otimizar_imagens': self.chk_otimizar_imagens.isChecked(),
+            'imagem_dimensao_max': self.imagem_dimensao_max,
+            'imagem_formato': self.imagem_formato,
+            'imagem_qualidade': self.imagem_qualidade,
+            'bytes_economizados': self.bytes_economizados,
+            'duplicados': self.duplicate_policy()
         }
         with open(CONFIG_FILE, 'w') as f:
             json.dump(dados, f)
+        self.release()
         super().closeEvent(event)
 
+    def done(self, result):
+        # Esc (reject) e accept passam por aqui sem passar pelo closeEvent
+        self.release()
+        super().done(result)
+
+    def release(self):
+        # Ao fechar, interromper uma adição em andamento após o lote atual e
+        # parar de ouvir as operações da coleção (pode ser chamado mais de uma vez).
+        # Uma colagem em lotes ainda em andamento para onde está.
+        self.cancel_add_cards()
+        if self.paste_job is not None:
+            self.paste_job.cancel()
+        gui_hooks.operation_did_execute.remove(self.on_operation_did_execute)
+
     def join_lines(self):
+        self.complete_paste()
         texto = self.txt_entrada.toPlainText()
         if '\n' not in texto:
             if hasattr(self, 'original_text'):
@@ -1154,7 +1071,7 @@ class CustomDialog(QDialog):
         else:
             self.original_text = texto
             self.txt_entrada.setPlainText(texto.replace('\n', ' '))
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def wrap_selected_text(self, tag):
@@ -1166,7 +1083,7 @@ class CustomDialog(QDialog):
             cursor.insertText(f"{tag[0]}{tag[1]}")
             cursor.movePosition(QTextCursor.MoveOperation.Left, QTextCursor.MoveMode.MoveAnchor, len(tag[1]))
             self.txt_entrada.setTextCursor(cursor)
-        self.previous_text = self.txt_entrada.toPlainText()
+        self.media_index.clear_changes()
         self.update_preview()
 
     def apply_bold(self): self.wrap_selected_text(('<b>', '</b>'))
@@ -1175,16 +1092,18 @@ class CustomDialog(QDialog):
     def destaque_texto(self): self.wrap_selected_text(('<mark>', '</mark>'))
 
     def manage_media(self):
+        self.complete_paste()
         # Escanear o texto para encontrar arquivos de mídia referenciados
         self.scan_media_files_from_text()
         
         if not self.media_files:
             showWarning("Nenhum arquivo de mídia foi adicionado ou referenciado no texto!")
             return
-        dialog = MediaManagerDialog(self, self.media_files, self.txt_entrada, mw)
+        dialog = MediaManagerDialog(self, self.media_files, self.txt_entrada, mw, self.media_index)
         dialog.exec()
 
     def view_cards_dialog(self):
+        self.complete_paste()
         if self.visualizar_dialog is None or not self.visualizar_dialog.isVisible():
             self.visualizar_dialog = VisualizarCards(self)
             self.visualizar_dialog.show()
@@ -0,0 +1,95 @@
+# duplicates.py
+
+# Detecção de cards cujo primeiro campo já existe no tipo de nota. O índice é
+# montado com uma única consulta SQL sobre a coluna csum da tabela notes
+# (checksum do primeiro campo sem HTML, mantido pelo próprio Anki) e cada
+# card é conferido com um acesso ao dicionário, não importa quantas linhas
+# foram coladas. Como o csum tem só 32 bits, o primeiro campo das notas
+# candidatas é conferido, com uma consulta por lote e só para as candidatas;
+# a mesma consulta traz os campos e as tags, usados para saber se uma nota
+# existente precisa mesmo ser atualizada.
+
+from anki.utils import field_checksum, ids2str, split_fields, strip_html_media
+
+# O que fazer com os cards duplicados ao adicionar (config.json: 'duplicados')
+DUPLICATE_SKIP = 'pular'
+DUPLICATE_UPDATE = 'atualizar'
+DUPLICATE_ALLOW = 'permitir'
+DUPLICATE_POLICIES = (
+    (DUPLICATE_SKIP, "Pular"),
+    (DUPLICATE_UPDATE, "Atualizar"),
+    (DUPLICATE_ALLOW, "Permitir"),
+)
+
+
+class DuplicateIndex:
+    def __init__(self, col, mid):
+        self.col = col
+        self.mid = mid
+        self.by_checksum = {}  # csum -> ids das notas
+        # Em ordem de criação: a nota mais antiga vem primeiro
+        for nid, csum in col.db.execute("select id, csum from notes where mid = ? order by id", mid):
+            self.by_checksum.setdefault(csum, []).append(nid)
+        self.first_fields = {}  # id da nota -> primeiro campo sem HTML (só das candidatas)
+        self.notes = {}  # id da nota -> (campos, tags em minúsculas) (só das candidatas)
+
+    def load(self, nids):
+        missing = [nid for nid in nids if nid not in self.first_fields]
+        if missing:
+            for nid, flds, tags in self.col.db.execute(f"select id, flds, tags from notes where id in {ids2str(missing)}"):
+                self.set_note(nid, split_fields(flds), tags.split())
+
+    def find_all(self, items):
+        # items: (chave, primeiro campo); devolve chave -> ids das notas com o mesmo primeiro campo
+        candidates = []
+        for key, field in items:
+            stripped = strip_html_media(field)
+            if stripped.strip():
+                nids = self.by_checksum.get(field_checksum(field))
+                if nids:
+                    candidates.append((key, stripped, nids))
+        self.load([nid for key, stripped, nids in candidates for nid in nids])
+        found = {}
+        for key, stripped, nids in candidates:
+            matches = [nid for nid in nids if self.first_fields.get(nid) == stripped]
+            if matches:
+                found[key] = matches
+        return found
+
+    def find(self, field):
+        return self.find_all([(None, field)]).get(None, [])
+
+    def set_note(self, nid, fields, tags):
+        self.first_fields[nid] = strip_html_media(fields[0])
+        self.notes[nid] = (list(fields), {tag.lower() for tag in tags})
+
+    def is_changed(self, nid, card):
+        # O card traz algum campo diferente ou alguma tag que a nota ainda não tem?
+        fields, tags = self.notes[nid]
+        if any(j >= len(fields) or fields[j] != campo for j, campo in enumerate(card.fields)):
+            return True
+        return any(tag.lower() not in tags for tag in card.tags)
+
+    def add(self, nota):
+        # Nota adicionada depois da montagem do índice (linhas repetidas no mesmo lote)
+        self.by_checksum.setdefault(field_checksum(nota.fields[0]), []).append(nota.id)
+        self.set_note(nota.id, nota.fields, nota.tags)
+
+
+class DuplicateIndexCache:
+    # Índice do tipo de nota atual para a pré-visualização e o Visualizar
+    # Cards, refeito só quando o tipo de nota muda ou a coleção é alterada
+    def __init__(self):
+        self.key = None
+        self.index = None
+
+    def get(self, col, mid):
+        key = (mid, col.mod)
+        if key != self.key:
+            self.index = DuplicateIndex(col, mid)
+            self.key = key
+        return self.index
+
+    def invalidate(self):
+        self.key = None
+        self.index = None
@@ -0,0 +1,115 @@
+# file_import.py
+
+# Importação direta de arquivos CSV/TSV (e XLSX, se o openpyxl estiver
+# instalado) sem passar pelo campo de texto: as linhas são lidas uma a uma,
+# as colunas são distribuídas entre os campos do tipo de nota (e uma coluna de
+# tags) e os cards vão direto para a inserção em lote. Só as primeiras linhas
+# são carregadas para a pré-visualização.
+
+import csv
+import os
+import re
+import zipfile
+from itertools import islice
+from .card_parser import ParsedCard
+
+# Linhas mostradas na pré-visualização da importação
+PREVIEW_ROWS = 20
+
+# Amostra usada para descobrir o separador de um CSV
+SNIFF_BYTES = 64 * 1024
+
+TAG_SEPARATORS = re.compile(r'[,\s]+')
+
+# Tamanho máximo de uma célula de CSV (o padrão do módulo csv é 128 KB);
+# 2**31 - 1 cabe no long do C também no Windows
+FIELD_SIZE_LIMIT = 2**31 - 1
+
+
+class FileImportError(Exception):
+    pass
+
+
+def cell_text(value):
+    # Células do XLSX chegam como números, datas ou None
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def detect_dialect(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.tsv', '.tab'):
+        return 'excel-tab'
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t|')
+    except csv.Error:
+        return 'excel-tab' if '\t' in sample else 'excel'
+
+
+def iter_xlsx_rows(path):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise FileImportError("Para importar arquivos XLSX é preciso ter o pacote openpyxl instalado. Salve a planilha como CSV ou TSV.")
+    # Planilha danificada: zip inválido, partes faltando ou XML malformado
+    # (ParseError do ElementTree e do lxml são SyntaxError)
+    errors = (zipfile.BadZipFile, InvalidFileException, KeyError, ValueError, SyntaxError)
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except errors as e:
+        raise FileImportError(f"Planilha XLSX inválida ou danificada: {str(e)}")
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [cell_text(value) for value in row]
+    except errors as e:
+        raise FileImportError(f"Planilha XLSX inválida ou danificada: {str(e)}")
+    finally:
+        workbook.close()
+
+
+def iter_rows(path):
+    # Gerador de linhas (listas de textos); o arquivo nunca é lido inteiro
+    if os.path.splitext(path)[1].lower() == '.xlsx':
+        yield from iter_xlsx_rows(path)
+        return
+    dialect = detect_dialect(path)
+    csv.field_size_limit(FIELD_SIZE_LIMIT)
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from csv.reader(f, dialect)
+
+
+def preview_rows(path, count=PREVIEW_ROWS):
+    return list(islice(iter_rows(path), count))
+
+
+class ColumnMapping:
+    def __init__(self, field_columns, tags_column=None, skip_header=False):
+        self.field_columns = field_columns  # Índice da coluna de cada campo (None = campo vazio)
+        self.tags_column = tags_column
+        self.skip_header = skip_header
+
+    def card(self, line, row):
+        fields = tuple(row[col].strip() if col is not None and col < len(row) else '' for col in self.field_columns)
+        tags = ()
+        if self.tags_column is not None and self.tags_column < len(row):
+            tags = tuple(tag for tag in TAG_SEPARATORS.split(row[self.tags_column]) if tag)
+        return ParsedCard(line, fields, tags)
+
+
+def iter_cards(path, mapping):
+    # Cards do arquivo, sob demanda; linhas totalmente vazias são ignoradas
+    rows = iter_rows(path)
+    if mapping.skip_header:
+        next(rows, None)
+    for line, row in enumerate(rows):
+        if not any(cell.strip() for cell in row):
+            continue
+        card = mapping.card(line, row)
+        if any(card.fields):
+            yield card
@@ -2,25 +2,61 @@
 
 import re
 from aqt.qt import QSyntaxHighlighter, QTextCharFormat, Qt
+from .card_parser import TAG_PATTERN, split_plan
+
+# Só para quando nenhum delimitador está marcado (sem plano de divisão)
+TAG_REGEX = re.compile(TAG_PATTERN)
+
+# Limite de linhas diferentes guardadas no cache de trechos destacados
+SPAN_CACHE_SIZE = 4096
 
 class HtmlTagHighlighter(QSyntaxHighlighter):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, delimitadores=(';',)):
         super().__init__(parent)
-        self.highlighting_rules = []
-        
-        # Formato para tags HTML (qualquer coisa entre < e >) - Vermelho
-        tag_format = QTextCharFormat()
-        tag_format.setForeground(Qt.GlobalColor.red)
-        self.highlighting_rules.append((re.compile(r'<[^>]+>'), tag_format))
-
-        # Formato para ponto e vírgula (;) - Fundo amarelo e letra preta
-        semicolon_format = QTextCharFormat()
-        semicolon_format.setBackground(Qt.GlobalColor.yellow)  # Fundo amarelo
-        semicolon_format.setForeground(Qt.GlobalColor.black)  # Letra preta
-        self.highlighting_rules.append((re.compile(r';'), semicolon_format))
+        # Formato para tags HTML (<b>, </i>, <img ...>...) - Vermelho
+        self.tag_format = QTextCharFormat()
+        self.tag_format.setForeground(Qt.GlobalColor.red)
+
+        # Formato para os delimitadores marcados (ex.: ;) - Fundo amarelo e letra preta
+        self.delim_format = QTextCharFormat()
+        self.delim_format.setBackground(Qt.GlobalColor.yellow)  # Fundo amarelo
+        self.delim_format.setForeground(Qt.GlobalColor.black)  # Letra preta
+
+        # Cache: texto da linha -> trechos ((início, tamanho, é_tag), ...)
+        self.span_cache = {}
+        self.delimitadores = ()
+        self.plan = None
+        self.set_delimitadores(delimitadores, rehighlight=False)
+
+    def set_delimitadores(self, delimitadores, rehighlight=True):
+        # Mesmo plano de divisão usado para montar os cards: uma só passada
+        # pela linha encontra as tags e os delimitadores que de fato separam
+        # campos (não os de dentro de tags, cloze, aspas ou URLs)
+        delimitadores = tuple(delimitadores)
+        if delimitadores == self.delimitadores and self.plan is not None:
+            return
+        self.delimitadores = delimitadores
+        self.plan = split_plan(delimitadores) if delimitadores else None
+        self.span_cache.clear()
+        if rehighlight:
+            self.rehighlight()
+
+    def scan(self, text):
+        spans = self.span_cache.get(text)
+        if spans is None:
+            if self.plan is None:
+                spans = tuple((m.start(), m.end() - m.start(), True) for m in TAG_REGEX.finditer(text))
+            else:
+                tags, delim, positions = self.plan.scan(text)
+                spans = tuple([(start, end - start, True) for start, end in tags] +
+                              [(pos, len(delim), False) for pos in positions])
+            if len(self.span_cache) >= SPAN_CACHE_SIZE:
+                self.span_cache.clear()
+            self.span_cache[text] = spans
+        return spans
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlighting_rules:
-            for match in pattern.finditer(text):
-                start, end = match.start(), match.end()
-                self.setFormat(start, end - start, format)
\ No newline at end of file
+        # O Qt limpa os formatos do bloco antes de chamar highlightBlock, então os
+        # trechos são sempre reaplicados; só a varredura é evitada para textos já vistos
+        for start, length, is_tag in self.scan(text):
+            self.setFormat(start, length, self.tag_format if is_tag else self.delim_format)
@@ -0,0 +1,148 @@
+# html_sanitizer.py
+
+# Limpeza do HTML colado com "Colar com Tags HTML". Em vez de várias
+# expressões regulares sobre o texto inteiro, o HTML é percorrido uma única
+# vez pelo html.parser (tempo linear, mesmo com vários megabytes):
+# - só as tags de formatação inline, de mídia, de listas e de tabelas são
+#   mantidas (com os atributos como vieram);
+# - script, style, head e title são descartados junto com o conteúdo;
+# - as demais tags de bloco (p, div, br, títulos...) terminam a linha: cada
+#   linha do resultado é um card;
+# - listas e tabelas ficam inteiras na mesma linha (o mesmo card), que termina
+#   junto com elas;
+# - espaços em sequência viram um só e as entidades (&nbsp; etc.) são mantidas.
+# Tabelas Markdown no texto são convertidas para HTML no final, também em uma linha.
+
+import re
+from html.parser import HTMLParser
+from .markdown_tables import convert_markdown_to_html
+
+INLINE_TAGS = {
+    'b', 'strong', 'i', 'em', 'u', 's', 'strike', 'del', 'ins', 'sub', 'sup', 'mark',
+    'span', 'font', 'code', 'small', 'big', 'img', 'audio', 'source', 'video',
+}
+LIST_TABLE_TAGS = {
+    'ul', 'ol', 'li', 'dl', 'dt', 'dd',
+    'table', 'caption', 'colgroup', 'col', 'thead', 'tbody', 'tfoot', 'tr', 'th', 'td',
+}
+ALLOWED_TAGS = INLINE_TAGS | LIST_TABLE_TAGS
+
+# Listas e tabelas: o conteúdo não é quebrado em linhas
+CONTAINER_TAGS = {'ul', 'ol', 'dl', 'table'}
+
+# Descartadas com todo o conteúdo
+SKIP_CONTENT_TAGS = {'script', 'style', 'head', 'title', 'template', 'noscript'}
+
+# Terminam a linha (fora de listas e tabelas)
+BLOCK_TAGS = {
+    'html', 'body', 'p', 'div', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'blockquote', 'pre', 'section', 'article', 'header', 'footer', 'nav', 'aside',
+    'main', 'figure', 'figcaption', 'address', 'center', 'form', 'fieldset',
+}
+
+VOID_TAGS = {'br', 'hr', 'img', 'source', 'col', 'wbr', 'meta', 'link', 'input'}
+
+WHITESPACE = re.compile(r'\s+')
+
+
+class HtmlSanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.lines = []
+        self.parts = []  # Trechos da linha atual
+        self.depth = 0  # Listas/tabelas abertas
+        self.skip = 0  # Tags descartadas com conteúdo abertas
+        self.space = True  # A linha atual termina em espaço (ou está vazia)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_CONTENT_TAGS:
+            self.skip += 1
+        elif self.skip:
+            return
+        elif tag in ALLOWED_TAGS:
+            self.emit(WHITESPACE.sub(' ', self.get_starttag_text()))
+            if tag in CONTAINER_TAGS:
+                self.depth += 1
+        elif tag in BLOCK_TAGS:
+            self.break_line(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/>, <img ... />: sem conteúdo, não abre nada
+        if self.skip:
+            return
+        if tag in ALLOWED_TAGS:
+            self.emit(WHITESPACE.sub(' ', self.get_starttag_text()))
+        elif tag in BLOCK_TAGS:
+            self.break_line(tag)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_CONTENT_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif self.skip:
+            return
+        elif tag in ALLOWED_TAGS:
+            if tag not in VOID_TAGS:
+                self.emit(f"</{tag}>")
+            if tag in CONTAINER_TAGS and self.depth:
+                self.depth -= 1
+                # Uma lista/tabela de primeiro nível encerra o card
+                if not self.depth:
+                    self.flush()
+        elif tag in BLOCK_TAGS:
+            self.break_line(tag)
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        text = WHITESPACE.sub(' ', data)
+        if self.space:
+            text = text.lstrip(' ')
+        if text:
+            self.parts.append(text)
+            self.space = text.endswith(' ')
+
+    def handle_entityref(self, name):
+        if not self.skip:
+            self.emit(f"&{name};")
+
+    def handle_charref(self, name):
+        if not self.skip:
+            self.emit(f"&#{name};")
+
+    def emit(self, text):
+        self.parts.append(text)
+        self.space = False
+
+    def break_line(self, tag):
+        if self.depth:
+            # Dentro de lista/tabela: <br> vira quebra visual, sem trocar de card
+            if tag == 'br':
+                self.emit('<br>')
+            elif not self.space:
+                self.parts.append(' ')
+                self.space = True
+            return
+        self.flush()
+
+    def flush(self):
+        line = ''.join(self.parts).strip()
+        if line:
+            self.lines.append(line)
+        self.parts = []
+        self.space = True
+
+    def close(self):
+        super().close()
+        self.flush()
+
+
+def sanitize_html(html):
+    # Linhas (cards) do HTML limpo
+    parser = HtmlSanitizer()
+    parser.feed(html)
+    parser.close()
+    return parser.lines
+
+
+def clean_raw_html(html):
+    return convert_markdown_to_html('\n'.join(sanitize_html(html)), compact=True)
@@ -0,0 +1,89 @@
+# image_optimizer.py
+
+# Etapa opcional aplicada às imagens que entram na pasta de mídia (colar
+# imagem, arrastar e soltar, "Adicionar Imagem..."): limita as dimensões,
+# regrava PNG/BMP (capturas de tela) como WebP ou JPEG na qualidade
+# configurada e descarta os metadados. O arquivo original é mantido quando a
+# versão otimizada não fica menor. Só usa QImage, então pode rodar fora da
+# thread da interface.
+
+import os
+from aqt.qt import QBuffer, QByteArray, QIODevice, QImage, QImageReader, QImageWriter, QPainter, QSize, Qt
+
+DEFAULT_MAX_DIMENSION = 1920
+DEFAULT_FORMAT = 'webp'
+DEFAULT_QUALITY = 85
+
+# Sem perdas (regravadas sempre) e com perdas (regravadas só se precisarem ser reduzidas)
+LOSSLESS_EXTENSIONS = ('.png', '.bmp')
+LOSSY_EXTENSIONS = ('.jpg', '.jpeg')
+
+FORMAT_EXTENSIONS = {'webp': '.webp', 'jpeg': '.jpg'}
+
+
+def supported_format(image_format):
+    # O WebP depende do plugin qtimageformats; sem ele, usar JPEG
+    formats = {bytes(fmt).decode().lower() for fmt in QImageWriter.supportedImageFormats()}
+    return image_format if image_format in formats and image_format in FORMAT_EXTENSIONS else 'jpeg'
+
+
+class ImageOptimizer:
+    def __init__(self, max_dimension=DEFAULT_MAX_DIMENSION, image_format=DEFAULT_FORMAT, quality=DEFAULT_QUALITY):
+        self.max_dimension = max_dimension
+        self.format = supported_format(image_format)
+        self.quality = quality
+        self.extension = FORMAT_EXTENSIONS[self.format]
+
+    def limit(self, size):
+        # Tamanho final respeitando a dimensão máxima (None se não precisa reduzir)
+        box = QSize(self.max_dimension, self.max_dimension)
+        if self.max_dimension and (size.width() > box.width() or size.height() > box.height()):
+            return size.scaled(box, Qt.AspectRatioMode.KeepAspectRatio)
+        return None
+
+    def clean(self, image):
+        # Pintar em uma imagem nova: as cópias de QImage levam junto os textos
+        # (metadados) e os gravadores PNG/JPEG os salvariam de volta
+        alpha = image.hasAlphaChannel() and self.format != 'jpeg'
+        clean = QImage(image.size(), QImage.Format.Format_ARGB32 if alpha else QImage.Format.Format_RGB32)
+        clean.fill(Qt.GlobalColor.transparent if alpha else Qt.GlobalColor.white)
+        painter = QPainter(clean)
+        painter.drawImage(0, 0, image)
+        painter.end()
+        return clean
+
+    def encode(self, image):
+        # Bytes da imagem reduzida e regravada no formato configurado
+        size = self.limit(image.size())
+        if size is not None:
+            image = image.scaled(size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        ok = self.clean(image).save(buffer, self.format.upper(), self.quality)
+        buffer.close()
+        return bytes(data) if ok else None
+
+    def encode_file(self, path):
+        # (bytes, extensão) da versão otimizada do arquivo, ou None para manter o original
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in LOSSLESS_EXTENSIONS and ext not in LOSSY_EXTENSIONS:
+            return None
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if not size.isValid():
+            return None
+        scaled = self.limit(size)
+        if ext in LOSSY_EXTENSIONS and scaled is None:
+            return None
+        if scaled is not None:
+            # Reduzir já na decodificação
+            reader.setScaledSize(scaled)
+        image = reader.read()
+        if image.isNull():
+            return None
+        data = self.encode(image)
+        if data is None or len(data) >= os.path.getsize(path):
+            return None
+        return data, self.extension
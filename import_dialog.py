@@ -0,0 +1,78 @@
+# import_dialog.py
+
+from aqt.qt import *
+from .file_import import ColumnMapping, preview_rows, PREVIEW_ROWS
+
+NO_COLUMN = "(vazio)"
+
+
+class FileImportDialog(QDialog):
+    # Mostra as primeiras linhas do arquivo e deixa escolher qual coluna vai
+    # para cada campo do tipo de nota e qual coluna tem as tags
+    def __init__(self, parent, path, campos):
+        super().__init__(parent)
+        self.path = path
+        self.campos = campos
+        self.rows = preview_rows(path)
+        self.num_columns = max((len(row) for row in self.rows), default=0)
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setWindowTitle("Importar Arquivo")
+        self.resize(800, 500)
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel(f"Primeiras {PREVIEW_ROWS} linhas de {self.path}:"))
+        self.table = QTableWidget(len(self.rows), self.num_columns)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        for i, row in enumerate(self.rows):
+            for j, cell in enumerate(row):
+                self.table.setItem(i, j, QTableWidgetItem(cell))
+        layout.addWidget(self.table)
+
+        self.chk_header = QCheckBox("Primeira linha é cabeçalho")
+        self.chk_header.stateChanged.connect(self.update_column_names)
+        layout.addWidget(self.chk_header)
+
+        # Uma lista de colunas para cada campo, mais a coluna de tags
+        form = QFormLayout()
+        self.field_combos = []
+        for i, campo in enumerate(self.campos):
+            combo = QComboBox()
+            self.field_combos.append(combo)
+            form.addRow(campo, combo)
+        self.tags_combo = QComboBox()
+        form.addRow("Tags", self.tags_combo)
+        layout.addLayout(form)
+        self.update_column_names()
+        # Sugestão inicial: colunas na mesma ordem dos campos
+        for i, combo in enumerate(self.field_combos):
+            combo.setCurrentIndex(i + 1 if i < self.num_columns else 0)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.button(QDialogButtonBox.StandardButton.Ok).setText("Importar")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def column_names(self):
+        header = self.rows[0] if self.chk_header.isChecked() and self.rows else []
+        return [f"Coluna {j + 1}" + (f" ({header[j]})" if j < len(header) and header[j] else "") for j in range(self.num_columns)]
+
+    def update_column_names(self, *args):
+        names = [NO_COLUMN] + self.column_names()
+        for combo in self.field_combos + [self.tags_combo]:
+            current = combo.currentIndex()
+            combo.clear()
+            combo.addItems(names)
+            combo.setCurrentIndex(max(0, current))
+
+    def mapping(self):
+        def column(combo):
+            return combo.currentIndex() - 1 if combo.currentIndex() > 0 else None
+        return ColumnMapping(
+            [column(combo) for combo in self.field_combos],
+            column(self.tags_combo),
+            self.chk_header.isChecked(),
+        )
@@ -0,0 +1,88 @@
+# line_sync.py
+
+from aqt.qt import QTextCursor
+
+
+class TagsLineSync:
+    # Mantém o campo de etiquetas com uma linha por linha do campo de cards.
+    # Em vez de comparar os dois textos inteiros a cada tecla, acompanha o
+    # contentsChange do documento de cards e aplica no documento de etiquetas
+    # apenas a diferença de blocos (inserir/remover N linhas vazias na posição
+    # P), preservando o histórico de desfazer e o cursor das etiquetas.
+    def __init__(self, document, tags_edit):
+        self.document = document
+        self.tags_edit = tags_edit
+        self.tags_document = tags_edit.document()
+        self.block_count = document.blockCount()
+        self.char_count = document.characterCount()
+        self.document.contentsChange.connect(self.on_contents_change)
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        count = self.document.blockCount()
+        delta = count - self.block_count
+        # O documento inteiro foi substituído (setPlainText): ajustar pelo final, como antes
+        full_replace = position == 0 and chars_removed >= self.char_count - 1
+        self.block_count = count
+        self.char_count = self.document.characterCount()
+        if delta == 0:
+            return
+        if full_replace:
+            # Inclusive quando o documento fica vazio (selecionar tudo + apagar)
+            self.sync()
+            return
+        block = self.document.findBlock(position)
+        # Mudança no início de uma linha: as etiquetas dessa linha acompanham o texto
+        line = block.blockNumber() if block.position() == position else block.blockNumber() + 1
+        if delta > 0:
+            self.insert_lines(line, delta)
+        else:
+            self.remove_lines(line, -delta)
+        self.sync()
+
+    def edit(self, action):
+        # Sem disparar o textChanged das etiquetas (a pré-visualização já é pedida pelo campo de cards)
+        blocked = self.tags_edit.blockSignals(True)
+        try:
+            action(QTextCursor(self.tags_document))
+        finally:
+            self.tags_edit.blockSignals(blocked)
+
+    def insert_lines(self, line, count):
+        def action(cursor):
+            block = self.tags_document.findBlockByNumber(line)
+            if block.isValid():
+                cursor.setPosition(block.position())
+                cursor.insertText('\n' * count)
+            else:
+                cursor.movePosition(QTextCursor.MoveOperation.End)
+                cursor.insertText('\n' * count)
+        self.edit(action)
+
+    def remove_lines(self, line, count):
+        tags_count = self.tags_document.blockCount()
+        if line >= tags_count:
+            return
+        end_line = line + count
+
+        def action(cursor):
+            if end_line < tags_count:
+                # Remover os blocos [line, end_line) junto com as quebras de linha seguintes
+                cursor.setPosition(self.tags_document.findBlockByNumber(line).position())
+                cursor.setPosition(self.tags_document.findBlockByNumber(end_line).position(), QTextCursor.MoveMode.KeepAnchor)
+            else:
+                # Até o fim do documento: remover também a quebra de linha anterior
+                if line > 0:
+                    previous = self.tags_document.findBlockByNumber(line - 1)
+                    cursor.setPosition(previous.position() + previous.length() - 1)
+                cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+        self.edit(action)
+
+    def sync(self):
+        # Igualar a quantidade de linhas pelo final (etiquetas a mais ou a menos)
+        count = self.document.blockCount()
+        tags_count = self.tags_document.blockCount()
+        if tags_count < count:
+            self.insert_lines(tags_count, count - tags_count)
+        elif tags_count > count:
+            self.remove_lines(count, tags_count - count)
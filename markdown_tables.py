@@ -0,0 +1,79 @@
+# markdown_tables.py
+
+# Conversão de tabelas Markdown em tabelas HTML, em uma única passada pelas
+# linhas. Cada tabela é convertida no lugar em que aparece (qualquer
+# quantidade de tabelas), linhas em branco são descartadas e as demais linhas
+# são mantidas sem os espaços do final. Com compact=True cada tabela fica em
+# uma única linha (um card). Não depende do Qt.
+
+import re
+
+# Linha de separação entre cabeçalho e corpo (ex.: | --- | :---: |). Cada
+# célula termina em | e só tem um jeito de casar: tempo linear mesmo para
+# linhas longas que não casam
+SEPARATOR_PATTERN = re.compile(r'^\|(?:\s*:?-+:?\s*\|)+\s*$')
+
+
+def is_table_row(line):
+    # Linha de tabela Markdown (ex.: | Coluna 1 | Coluna 2 |), já sem espaços nas pontas
+    return line.startswith('|') and line.endswith('|') and '|' in line[1:-1]
+
+
+def split_cells(line):
+    return [cell.strip() for cell in line[1:-1].split('|')]
+
+
+class MarkdownTable:
+    def __init__(self, header_line, separator_line):
+        self.source = [header_line, separator_line]  # Devolvidas como texto se a tabela não tiver linhas
+        self.headers = split_cells(header_line)
+        self.rows = []
+
+    def add_row(self, line):
+        cells = split_cells(line)
+        width = len(self.headers)
+        if len(cells) < width:
+            cells.extend([''] * (width - len(cells)))
+        self.rows.append(f"<tr><td>{'</td><td>'.join(cells[:width])}</td></tr>\n")
+
+    def html(self, compact=False):
+        if not self.rows:
+            return '\n'.join(self.source)
+        head = ''.join(f"<th>{header}</th>" for header in self.headers)
+        html = ''.join([f"<table>\n<thead>\n<tr>{head}</tr>\n</thead>\n<tbody>\n", *self.rows, "</tbody>\n</table>"])
+        return html.replace('\n', '') if compact else html
+
+
+def convert_markdown_to_html(text, compact=False):
+    lines = text.split('\n')
+    total = len(lines)
+    output = []
+    table = None
+    i = 0
+    while i < total:
+        line = lines[i].rstrip()
+        stripped = line.strip()
+        i += 1
+        if not stripped:
+            # Linhas em branco são removidas e não encerram a tabela
+            continue
+        if is_table_row(stripped):
+            # Cabeçalho seguido da linha de separação: começa uma nova tabela
+            separator = lines[i].strip() if i < total else ''
+            if '-' in separator and SEPARATOR_PATTERN.match(separator):
+                if table is not None:
+                    output.append(table.html(compact))
+                table = MarkdownTable(line, separator)
+                i += 1
+                continue
+            if table is not None:
+                table.add_row(stripped)
+                continue
+        elif table is not None:
+            # Fim da tabela
+            output.append(table.html(compact))
+            table = None
+        output.append(line)
+    if table is not None:
+        output.append(table.html(compact))
+    return '\n'.join(output).rstrip()
@@ -0,0 +1,105 @@
+# media_index.py
+
+import re
+
+# Referências de mídia no texto dos cards (mesmas tags tratadas pela
+# pré-visualização); o src pode vir depois de outros atributos (<img alt="" src="...">)
+MEDIA_SRC_PATTERN = re.compile(r'<(?:img|source|video)\b[^>]*?\ssrc="([^"]+)"')
+
+
+def scan_block(text):
+    # Nomes de arquivo referenciados em uma linha, na ordem em que aparecem
+    if 'src="' not in text:
+        return ()
+    return tuple(MEDIA_SRC_PATTERN.findall(text))
+
+
+class MediaReferenceIndex:
+    # Índice das referências de mídia por bloco do documento de cards. É
+    # atualizado pelo contentsChange, reprocessando só os blocos alterados, e
+    # registra quais nomes deixaram de ser referenciados e quais passaram a
+    # ser desde a última consulta, na ordem em que mudaram. Assim a detecção de
+    # renomeação não precisa varrer nem comparar o texto inteiro.
+    def __init__(self, document):
+        self.document = document
+        self.block_refs = []  # Número do bloco -> nomes referenciados no bloco
+        self.counts = {}  # Nome do arquivo -> quantidade de referências no documento
+        self.changed = {}  # Nome que passou de/para zero referências -> se existia antes
+        self.rebuild()
+        self.document.contentsChange.connect(self.on_contents_change)
+
+    def rebuild(self):
+        self.block_refs = []
+        self.counts = {}
+        block = self.document.begin()
+        while block.isValid():
+            refs = scan_block(block.text())
+            self.block_refs.append(refs)
+            for name in refs:
+                self.counts[name] = self.counts.get(name, 0) + 1
+            block = block.next()
+        self.clear_changes()
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        first = self.document.findBlock(position).blockNumber()
+        end = min(position + chars_added, self.document.characterCount() - 1)
+        last = max(first, self.document.findBlock(end).blockNumber())
+        delta = self.document.blockCount() - len(self.block_refs)
+        old_last = last - delta
+
+        new_refs = []
+        block = self.document.findBlockByNumber(first)
+        for _ in range(first, last + 1):
+            new_refs.append(scan_block(block.text()))
+            block = block.next()
+
+        for refs in self.block_refs[first:old_last + 1]:
+            for name in refs:
+                self.release(name)
+        for refs in new_refs:
+            for name in refs:
+                self.acquire(name)
+        self.block_refs[first:old_last + 1] = new_refs
+
+    def acquire(self, name):
+        count = self.counts.get(name, 0)
+        self.counts[name] = count + 1
+        if count == 0:
+            self.changed.setdefault(name, False)
+
+    def release(self, name):
+        count = self.counts[name] - 1
+        if count:
+            self.counts[name] = count
+        else:
+            del self.counts[name]
+            self.changed.setdefault(name, True)
+
+    def take_changes(self):
+        # (nomes removidos, nomes novos) desde a última consulta; um nome que
+        # saiu e voltou (ou entrou e saiu) no intervalo não conta como mudança
+        removed = [name for name, existia in self.changed.items() if existia and name not in self.counts]
+        added = [name for name, existia in self.changed.items() if not existia and name in self.counts]
+        self.clear_changes()
+        return removed, added
+
+    def clear_changes(self):
+        # Aceitar o estado atual (ex.: após uma inserção feita pelo próprio add-on)
+        self.changed = {}
+
+    def names(self):
+        return list(self.counts)
+
+    def lines(self, name):
+        return [number for number, refs in enumerate(self.block_refs) if name in refs]
+
+    def spans(self, name):
+        # Posições exatas (início, fim) do nome em cada src="..." que o referencia
+        result = []
+        for number in self.lines(name):
+            block = self.document.findBlockByNumber(number)
+            for match in MEDIA_SRC_PATTERN.finditer(block.text()):
+                if match.group(1) == name:
+                    start, end = match.span(1)
+                    result.append((block.position() + start, block.position() + end))
+        return result
@@ -0,0 +1,147 @@
+# media_ingest.py
+
+# Cópia de arquivos para a pasta de mídia do Anki (arrastar e soltar e botão
+# "Adicionar Imagem, Som ou Vídeo"). A pasta é listada uma única vez; os
+# arquivos são comparados pelo hash do conteúdo para reaproveitar o que já
+# está na pasta (ou repetido no próprio lote) e as cópias rodam em paralelo.
+# Com um ImageOptimizer, as imagens são reduzidas/regravadas antes da
+# comparação, então a mesma imagem colada de novo também é reaproveitada.
+
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .utils import file_hash
+
+# Cópias/hashes simultâneos (limitado pelo disco, não pela CPU)
+MAX_WORKERS = 4
+
+IMAGE_EXTENSIONS = ('.png', '.xpm', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg')
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.avi', '.mkv', '.mov')
+
+
+def media_tag(file_name):
+    # Tag HTML inserida no campo de cards para o arquivo ('' se o tipo não é suportado)
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return f'<img src="{file_name}">\n'
+    if ext in AUDIO_EXTENSIONS:
+        return f'<audio controls=""><source src="{file_name}" type="audio/mpeg"></audio>\n'
+    if ext in VIDEO_EXTENSIONS:
+        return f'<video src="{file_name}" controls width="320" height="240"></video>\n'
+    return ''
+
+
+def numbered_name(media_dir, base_name, ext):
+    # Primeiro nome livre entre base1.ext, base2.ext... (imagens coladas).
+    # Poucas consultas ao disco, sem listar a pasta inteira como o MediaFolder
+    counter = 1
+    while os.path.exists(os.path.join(media_dir, f"{base_name}{counter}{ext}")):
+        counter += 1
+    return f"{base_name}{counter}{ext}"
+
+
+class MediaFolder:
+    # Retrato da pasta de mídia feito com uma única listagem: nomes ocupados
+    # (sem diferenciar maiúsculas, como nos sistemas de arquivos do Windows e
+    # do macOS) e arquivos agrupados por tamanho, para só calcular o hash dos
+    # candidatos a duplicata
+    def __init__(self, media_dir):
+        self.media_dir = media_dir
+        self.taken = set()
+        self.by_size = {}
+        with os.scandir(media_dir) as entries:
+            for entry in entries:
+                self.taken.add(entry.name.lower())
+                if entry.is_file():
+                    self.by_size.setdefault(entry.stat().st_size, []).append(entry.name)
+
+    def find_same_content(self, size, digest):
+        for name in self.by_size.get(size, ()):
+            try:
+                if file_hash(os.path.join(self.media_dir, name)) == digest:
+                    return name
+            except OSError:
+                continue
+        return None
+
+    def allocate(self, file_name):
+        # nome.ext, nome1.ext, nome2.ext... sem consultar o disco a cada tentativa
+        base_name, ext = os.path.splitext(file_name)
+        counter = 1
+        while file_name.lower() in self.taken:
+            file_name = f"{base_name}{counter}{ext}"
+            counter += 1
+        self.taken.add(file_name.lower())
+        return file_name
+
+
+class IngestJob:
+    def __init__(self, media_dir, file_paths, optimizer=None):
+        self.media_dir = media_dir
+        self.optimizer = optimizer
+        self.file_paths = [path for path in file_paths if os.path.isfile(path)]
+        self.total = len(self.file_paths)
+        self.names = []  # Nome final de cada arquivo na pasta de mídia, na ordem recebida
+        self.copied = 0
+        self.reused = 0
+        self.saved_bytes = 0  # Economia das imagens otimizadas
+
+    def prepare(self, path):
+        # (nome sugerido, bytes otimizados ou None, hash, tamanho final, economia)
+        file_name = os.path.basename(path)
+        optimized = self.optimizer.encode_file(path) if self.optimizer else None
+        if optimized is None:
+            return file_name, None, file_hash(path), os.path.getsize(path), 0
+        data, ext = optimized
+        saved = os.path.getsize(path) - len(data)
+        return os.path.splitext(file_name)[0] + ext, data, hashlib.sha1(data).hexdigest(), len(data), saved
+
+    def store(self, path, data, name):
+        destino = os.path.join(self.media_dir, name)
+        if data is None:
+            shutil.copy(path, destino)
+        else:
+            with open(destino, 'wb') as f:
+                f.write(data)
+
+    def run(self, on_progress=None):
+        # Executado em segundo plano
+        folder = MediaFolder(self.media_dir)
+        with ThreadPoolExecutor(MAX_WORKERS) as pool:
+            prepared = list(pool.map(self.prepare, self.file_paths))
+
+            # Escolher os nomes em ordem (determinístico), reaproveitando conteúdos iguais
+            planned = {}  # hash -> nome na pasta
+            copies = []
+            for path, (file_name, data, digest, size, saved) in zip(self.file_paths, prepared):
+                name = planned.get(digest)
+                if name is None:
+                    name = folder.find_same_content(size, digest)
+                    if name is None:
+                        name = folder.allocate(file_name)
+                        copies.append((path, data, name))
+                        self.saved_bytes += saved
+                    else:
+                        self.reused += 1
+                    planned[digest] = name
+                else:
+                    self.reused += 1
+                self.names.append(name)
+
+            done = self.total - len(copies)
+            if on_progress:
+                on_progress(done, self.total)
+            futures = [pool.submit(self.store, path, data, name) for path, data, name in copies]
+            for future in as_completed(futures):
+                future.result()
+                self.copied += 1
+                done += 1
+                if on_progress:
+                    on_progress(done, self.total)
+        return self.names
+
+    def tags(self):
+        # Texto a inserir no campo de cards (uma tag por arquivo suportado)
+        return ''.join(media_tag(name) for name in self.names)
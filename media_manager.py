@@ -5,23 +5,34 @@ import subprocess  # Para abrir o arquivo com o player padrão
 from aqt.qt import *
 from aqt.utils import showInfo, showWarning
 from aqt.webview import QWebEngineView
+from .thumbnails import ThumbnailCache, ICON_SIZE, PREVIEW_SIZE, is_image
 
 class MediaManagerDialog(QDialog):
-    def __init__(self, parent, media_files, txt_entrada, mw_instance):
+    def __init__(self, parent, media_files, txt_entrada, mw_instance, media_index):
         super().__init__(parent)
         self.media_files = media_files
         self.txt_entrada = txt_entrada
+        self.media_index = media_index  # Índice de referências de mídia do campo de cards
         self.mw = mw_instance  # Receber a instância de mw
         self.media_dir = self.mw.col.media.dir()  # Diretório de mídia do Anki
+        self.thumbnails = ThumbnailCache(self.mw, self.media_dir)
+        self.closed = False  # Miniaturas que chegarem depois de fechar são ignoradas
         self.setup_ui()
+        self.load_thumbnails()
 
     def setup_ui(self):
         self.setWindowTitle("Gerenciar Mídia")
-        self.resize(400, 300)
+        self.resize(600, 400)
         layout = QVBoxLayout()
 
-        # Lista de arquivos de mídia
+        # Lista de arquivos de mídia (ícones com miniaturas das imagens)
         self.media_list = QListWidget()
+        self.media_list.setViewMode(QListView.ViewMode.IconMode)
+        self.media_list.setIconSize(ICON_SIZE)
+        self.media_list.setGridSize(QSize(ICON_SIZE.width() + 40, ICON_SIZE.height() + 40))
+        self.media_list.setResizeMode(QListView.ResizeMode.Adjust)
+        self.media_list.setMovement(QListView.Movement.Static)
+        self.media_list.setWordWrap(True)
         self.media_list.addItems(self.media_files)
         self.media_list.setSelectionMode(QListWidget.SelectionMode.SingleSelection)
         layout.addWidget(self.media_list)
@@ -44,6 +55,22 @@ class MediaManagerDialog(QDialog):
         layout.addLayout(btn_layout)
         self.setLayout(layout)
 
+    def load_thumbnails(self):
+        # As miniaturas são geradas em segundo plano e aparecem conforme ficam prontas
+        for file_name in self.media_files:
+            if is_image(file_name) and os.path.exists(os.path.join(self.media_dir, file_name)):
+                self.thumbnails.request(file_name, ICON_SIZE, self.set_thumbnail)
+
+    def set_thumbnail(self, file_name, image):
+        if self.closed or image is None:
+            return
+        for item in self.media_list.findItems(file_name, Qt.MatchFlag.MatchExactly):
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+
+    def done(self, result):
+        self.closed = True
+        super().done(result)
+
     def delete_file(self):
         selected_item = self.media_list.currentItem()
         if not selected_item:
@@ -58,9 +85,7 @@ class MediaManagerDialog(QDialog):
                 self.media_files.remove(file_name)
                 self.media_list.takeItem(self.media_list.currentRow())
                 # Atualizar o texto para remover referências ao arquivo excluído
-                current_text = self.txt_entrada.toPlainText()
-                updated_text = current_text.replace(file_name, "")
-                self.txt_entrada.setPlainText(updated_text)
+                self.replace_references(file_name, "")
                 showInfo(f"Arquivo '{file_name}' excluído com sucesso!")
             except Exception as e:
                 showWarning(f"Erro ao excluir o arquivo: {str(e)}")
@@ -92,16 +117,33 @@ class MediaManagerDialog(QDialog):
                 index = self.media_files.index(old_name)
                 self.media_files[index] = new_name
                 selected_item.setText(new_name)
+                if is_image(new_name):
+                    self.thumbnails.request(new_name, ICON_SIZE, self.set_thumbnail)
                 # Atualizar o texto no QTextEdit
-                current_text = self.txt_entrada.toPlainText()
-                updated_text = current_text.replace(old_name, new_name)
-                self.txt_entrada.setPlainText(updated_text)
+                self.replace_references(old_name, new_name)
                 showInfo(f"Arquivo renomeado de '{old_name}' para '{new_name}' com sucesso!")
             except Exception as e:
                 showWarning(f"Erro ao renomear o arquivo: {str(e)}")
         else:
             showWarning(f"Arquivo '{old_name}' não encontrado na pasta de mídia!")
 
+    def replace_references(self, old_name, new_name):
+        # Editar apenas os src="..." que referenciam o arquivo, em um único passo
+        # de desfazer, sem reescrever o documento (mantém cursor e histórico)
+        spans = self.media_index.spans(old_name)
+        if not spans:
+            return
+        cursor = QTextCursor(self.txt_entrada.document())
+        cursor.beginEditBlock()
+        # Do fim para o início, para que as posições anteriores continuem válidas
+        for start, end in reversed(spans):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(new_name)
+        cursor.endEditBlock()
+        # Mudança feita pelo próprio add-on: não tratar como renomeação manual
+        self.media_index.clear_changes()
+
     def preview_media(self):
         selected_item = self.media_list.currentItem()
         if not selected_item:
@@ -116,8 +158,9 @@ class MediaManagerDialog(QDialog):
 
         ext = os.path.splitext(file_name)[1].lower()
         if ext in ('.png', '.jpg', '.jpeg'):
-            # Visualizar imagens estáticas (PNG, JPG, JPEG) em uma nova janela
-            self.preview_image(file_path, file_name)
+            # Visualizar imagens estáticas (PNG, JPG, JPEG) em uma nova janela,
+            # decodificadas já reduzidas em segundo plano
+            self.thumbnails.request(file_name, PREVIEW_SIZE, self.preview_image)
         elif ext == '.gif':
             # Visualizar GIFs animados usando QMovie
             self.preview_gif(file_path, file_name)
@@ -127,23 +170,20 @@ class MediaManagerDialog(QDialog):
         else:
             showWarning(f"Tipo de arquivo '{ext}' não suportado para visualização!")
 
-    def preview_image(self, file_path, file_name):
+    def preview_image(self, file_name, image):
+        if self.closed:
+            return
+        if image is None:
+            showWarning(f"Erro ao carregar a imagem '{file_name}'!")
+            return
+
         dialog = QDialog(self)
         dialog.setWindowTitle(f"Visualizar: {file_name}")
         layout = QVBoxLayout()
 
-        # Carregar e exibir a imagem
-        image = QImage(file_path)
-        if image.isNull():
-            showWarning(f"Erro ao carregar a imagem '{file_name}'!")
-            return
-
+        # A imagem já vem reduzida para caber na janela (PREVIEW_SIZE), mantendo a proporção
         label = QLabel()
-        pixmap = QPixmap.fromImage(image)
-        # Redimensionar a imagem para caber na janela, mantendo a proporção
-        max_size = QSize(600, 400)
-        scaled_pixmap = pixmap.scaled(max_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-        label.setPixmap(scaled_pixmap)
+        label.setPixmap(QPixmap.fromImage(image))
         layout.addWidget(label)
 
         # Botão para fechar
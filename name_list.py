@@ -0,0 +1,133 @@
+# name_list.py
+
+# Listas de decks e de tipos de nota com pesquisa. Os nomes são lidos da
+# coleção uma vez e guardados (já normalizados para a pesquisa) em um modelo;
+# a pesquisa é um filtro (QSortFilterProxyModel) sobre esse modelo, sem
+# consultar a coleção nem recriar os itens a cada tecla. A lista só é relida
+# quando decks ou tipos de nota mudam (refresh).
+#
+# A pesquisa ignora maiúsculas e acentos e aceita letras salteadas
+# ("ingvb" encontra "Inglês::Verbos"). Com "::" cada parte é procurada em
+# um nível da hierarquia, em ordem ("idi::verb" encontra
+# "Idiomas::Inglês::Verbos"); "Idiomas::" mostra só os subdecks de Idiomas.
+
+import unicodedata
+from aqt.qt import QAbstractListModel, QListView, QModelIndex, QSortFilterProxyModel, Qt
+
+
+def normalize(text):
+    # Minúsculas e sem acentos
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def is_subsequence(query, text):
+    chars = iter(text)
+    return all(c in chars for c in query)
+
+
+def parse_query(text):
+    # Partes da pesquisa, uma por nível ("a::b" -> ['a', 'b']); [] = sem filtro
+    text = normalize(text.strip())
+    return [part.strip() for part in text.split('::')] if text else []
+
+
+def matches(query_parts, name_parts, full_name):
+    if len(query_parts) == 1:
+        return is_subsequence(query_parts[0], full_name)
+    # Cada parte em um nível, em ordem (níveis podem ser pulados)
+    level = 0
+    for part in query_parts:
+        while level < len(name_parts) and not is_subsequence(part, name_parts[level]):
+            level += 1
+        if level == len(name_parts):
+            return False
+        level += 1
+    return True
+
+
+class NameListModel(QAbstractListModel):
+    def __init__(self, load_names, parent=None):
+        super().__init__(parent)
+        self.load_names = load_names  # Função que lê os nomes da coleção
+        self.names = []
+        self.keys = []  # (nome normalizado, níveis normalizados) de cada nome
+        self.rows = {}  # nome -> linha
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.names = list(self.load_names())
+        self.keys = []
+        for name in self.names:
+            key = normalize(name)
+            self.keys.append((key, key.split('::')))
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid() and index.row() < len(self.names):
+            return self.names[index.row()]
+        return None
+
+
+class NameFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query_parts = []
+
+    def set_query(self, text):
+        query_parts = parse_query(text)
+        if query_parts != self.query_parts:
+            self.query_parts = query_parts
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self.query_parts:
+            return True
+        full_name, name_parts = self.sourceModel().keys[source_row]
+        return matches(self.query_parts, name_parts, full_name)
+
+
+class NameList(QListView):
+    # Lista de nomes com filtro; current_name() é o nome selecionado (ou None)
+    def __init__(self, load_names, parent=None):
+        super().__init__(parent)
+        self.source = NameListModel(load_names, self)
+        self.proxy = NameFilterProxy(self)
+        self.proxy.setSourceModel(self.source)
+        self.setModel(self.proxy)
+        self.setUniformItemSizes(True)
+
+    def current_name(self):
+        index = self.currentIndex()
+        return index.data() if index.isValid() else None
+
+    def setCurrentRow(self, row):
+        self.setCurrentIndex(self.proxy.index(row, 0))
+
+    def select_name(self, name):
+        row = self.source.rows.get(name)
+        if row is None:
+            return False
+        index = self.proxy.mapFromSource(self.source.index(row, 0))
+        if not index.isValid():
+            return False
+        self.setCurrentIndex(index)
+        return True
+
+    def set_filter(self, text):
+        self.proxy.set_query(text)
+        # Como antes: ao pesquisar, o primeiro resultado fica selecionado
+        if text.strip() and self.proxy.rowCount():
+            self.setCurrentRow(0)
+
+    def refresh(self):
+        # Reler os nomes da coleção mantendo a seleção, se o nome ainda existir
+        name = self.current_name()
+        self.source.refresh()
+        if name is not None:
+            self.select_name(name)
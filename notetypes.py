@@ -0,0 +1,58 @@
+# notetypes.py
+
+# Dados dos tipos de nota usados pela pré-visualização, pelo Visualizar Cards
+# e pela adição de cards: o tipo de nota é resolvido pelo nome uma vez e os
+# dados (campos, ordens, cloze ou padrão, campo de ordenação, modelos de
+# card) ficam guardados por id e mtime. Quando algum tipo de nota muda
+# (invalidate), os nomes voltam a ser resolvidos, mas os dados só são
+# refeitos para os tipos de nota cujo mtime mudou.
+
+# Valor de modelo['type'] para tipos de nota cloze (anki.consts.MODEL_CLOZE)
+MODEL_CLOZE = 1
+
+
+class NotetypeInfo:
+    __slots__ = ('model', 'id', 'name', 'mtime', 'fields', 'ords', 'is_cloze', 'sort_field', 'templates')
+
+    def __init__(self, modelo):
+        self.model = modelo  # Dicionário do tipo de nota (para col.new_note)
+        self.id = modelo['id']
+        self.name = modelo['name']
+        self.mtime = modelo.get('mod', 0)
+        self.fields = [fld['name'] for fld in modelo['flds']]
+        self.ords = [fld.get('ord', i) for i, fld in enumerate(modelo['flds'])]
+        self.is_cloze = modelo.get('type') == MODEL_CLOZE
+        self.sort_field = modelo.get('sortf', 0)
+        self.templates = [tmpl['name'] for tmpl in modelo.get('tmpls', [])]
+
+    def field_count_warning(self, count):
+        # Aviso para uma linha com mais ou menos campos que o tipo de nota (None se bate)
+        total = len(self.fields)
+        if count > total:
+            return f"A linha tem {count} campos e o tipo de nota \"{self.name}\" tem {total}: os campos a mais serão ignorados."
+        if count < total:
+            return f"A linha tem {count} campos e o tipo de nota \"{self.name}\" tem {total}: os campos que faltam ficarão vazios."
+        return None
+
+
+class NotetypeCache:
+    def __init__(self):
+        self.by_name = {}  # nome -> NotetypeInfo
+        self.by_id = {}  # id -> NotetypeInfo (da versão com o mtime guardado)
+
+    def get(self, col, name):
+        # NotetypeInfo do tipo de nota, ou None se ele não existe
+        info = self.by_name.get(name)
+        if info is None and name:
+            modelo = col.models.by_name(name)
+            if modelo is None:
+                return None
+            info = self.by_id.get(modelo['id'])
+            if info is None or info.mtime != modelo.get('mod', 0):
+                info = self.by_id[modelo['id']] = NotetypeInfo(modelo)
+            self.by_name[name] = info
+        return info
+
+    def invalidate(self):
+        # Algum tipo de nota mudou (criado, renomeado, campos editados...)
+        self.by_name.clear()
@@ -0,0 +1,225 @@
+# preview.py
+
+import os
+import re
+import urllib.parse
+from aqt import mw
+from aqt.qt import QTimer, QUrl
+from .card_parser import split_line, parse_tags
+
+# Tempo de espera padrão (ms) antes de renderizar após uma rajada de edições
+DEFAULT_PREVIEW_DELAY_MS = 150
+
+# Cabeçalho comum da pré-visualização (estilos para tabelas e listas coladas)
+PREVIEW_HEADER = """
+        <html><body style="font-family: Arial, sans-serif; background-color: #f9f9f9; padding: 10px;">
+        <style>
+            table {
+                border-collapse: collapse;
+                width: 100%;
+                margin: 5px 0;
+            }
+            th, td {
+                border: 1px solid #ddd;
+                padding: 8px;
+                text-align: left;
+                vertical-align: top;
+                width: 33%;  /* Distribuir igualmente as colunas */
+                box-sizing: border-box;
+            }
+            th {
+                background-color: #f2f2f2;
+                font-weight: bold;
+            }
+            ul, ol {
+                margin: 5px 0;
+                padding-left: 20px;
+            }
+        </style>
+        """
+
+CARD_TABLE_OPEN = """
+                <table style="width: 100%; border-collapse: separate; border-spacing: 0; box-shadow: 0 4px 8px rgba(0,0,0,0.1); border-radius: 8px; margin-bottom: 20px;">
+                """
+
+FIELD_ROWS = """
+                    <tr><td style="background-color: #444; color: white; padding: 12px; text-align: center; font-weight: bold; font-size: 16px; border-top-left-radius: 8px; border-top-right-radius: 8px;">{nome}</td></tr>
+                    <tr><td style="padding: 15px; border: 1px solid #ddd; background-color: white; border-bottom-left-radius: 8px; border-bottom-right-radius: 8px;">{valor}</td></tr>
+                    """
+
+# Aviso mostrado acima do card quando o primeiro campo já existe no tipo de nota
+DUPLICATE_WARNING = """
+                <p style="color: #b00020; font-weight: bold;">Duplicado: o primeiro campo já existe em {count} nota(s) deste tipo.</p>
+                """
+
+# Aviso para linhas com mais ou menos campos que o tipo de nota
+FIELD_COUNT_WARNING = """
+                <p style="color: #8a5a00; font-weight: bold;">{aviso}</p>
+                """
+
+
+def media_base_url():
+    # URL base da pré-visualização: as mídias são carregadas direto da pasta do Anki
+    return QUrl.fromLocalFile(os.path.join(mw.col.media.dir(), ''))
+
+
+def replace_media_src(match, media_dir, media_type="img"):
+    file_name = match.group(1)
+    if file_name.startswith(('data:', 'http:', 'https:', 'file:')):
+        return match.group(0)
+    try:
+        stat = os.stat(os.path.join(media_dir, file_name))
+    except OSError:
+        print(f"Arquivo não encontrado: {os.path.join(media_dir, file_name)}")
+        return match.group(0)
+    # O sufixo ?v= muda quando o arquivo muda, evitando que o navegador use uma versão antiga
+    url = f"{urllib.parse.quote(file_name)}?v={stat.st_mtime_ns:x}-{stat.st_size:x}"
+    return f'<{media_type} src="{url}"' + (" controls width=\"320\" height=\"240\"" if media_type == "video" else "")
+
+
+def link_media(campo, media_dir):
+    # Apontar as referências de mídia do campo para os arquivos (relativos a media_base_url)
+    for tag, type_ in [('<img', 'img'), ('<source', 'source'), ('<video', 'video')]:
+        if tag in campo:
+            campo = re.sub(rf'{tag} src="([^"]+)"', lambda m: replace_media_src(m, media_dir, type_), campo)
+    return campo
+
+
+class PreviewEngine:
+    # Motor da pré-visualização embutida: mantém um cache de cards por linha
+    # (número do bloco -> revisão do bloco, texto, partes) e só reprocessa o
+    # bloco que mudou. Quando o card renderizado é igual ao último, render()
+    # devolve None e o chamador não precisa chamar setHtml.
+    def __init__(self, document, tags_document):
+        self.document = document
+        self.tags_document = tags_document
+        self.line_cache = {}
+        self.delimitadores = ()
+        self.notetype = None  # NotetypeInfo do tipo de nota selecionado
+        self.model_id = None
+        self.campos = []
+        self.duplicates = None  # DuplicateIndex do tipo de nota (None = sem verificação)
+        self.last_signature = None
+        self.parse_count = 0
+        self.document.blockCountChanged.connect(self.prune)
+
+    def set_delimitadores(self, delimitadores):
+        delimitadores = tuple(delimitadores)
+        if delimitadores != self.delimitadores:
+            self.delimitadores = delimitadores
+            self.line_cache.clear()
+
+    def set_model(self, notetype):
+        # NotetypeInfo já resolvido pelo cache de tipos de nota (ou None)
+        if notetype is not self.notetype:
+            self.campos = notetype.fields if notetype else []
+            self.model_id = notetype.id if notetype else None
+            self.notetype = notetype
+
+    def set_duplicates(self, index):
+        self.duplicates = index
+
+    def invalidate(self):
+        # Forçar a próxima renderização (ex.: mídia renomeada ou tipo de nota editado)
+        self.line_cache.clear()
+        self.set_model(None)
+        self.last_signature = None
+
+    def prune(self, block_count):
+        for number in [n for n in self.line_cache if n >= block_count]:
+            del self.line_cache[number]
+
+    def parse_block(self, block):
+        number = block.blockNumber()
+        revision = block.revision()
+        text = block.text()
+        entry = self.line_cache.get(number)
+        if entry is not None and entry[0] == revision and entry[1] == text:
+            return entry[2]
+        partes = split_line(text, self.delimitadores)
+        self.line_cache[number] = (revision, text, partes)
+        self.parse_count += 1
+        return partes
+
+    def tags_for_line(self, line, numerar_tags):
+        block = self.tags_document.findBlockByNumber(line)
+        if not block.isValid():
+            return ()
+        return parse_tags(block.text(), numerar_tags, line)
+
+    def render_blank(self):
+        if self.last_signature == ():
+            return None
+        self.last_signature = ()
+        return ""
+
+    def render(self, line, numerar_tags):
+        block = self.document.findBlockByNumber(line)
+        if not block.isValid() or not self.delimitadores or not self.campos:
+            return self.render_blank()
+        partes = self.parse_block(block)
+        if partes is None:
+            return self.render_blank()
+
+        tags_str = ', '.join(self.tags_for_line(line, numerar_tags))
+
+        campos = self.campos
+        valores = partes[:len(campos)]
+        duplicados = len(self.duplicates.find(valores[0])) if self.duplicates is not None and valores else 0
+        aviso = self.notetype.field_count_warning(len(partes))
+        signature = (valores, tuple(campos), tags_str, duplicados, aviso)
+        if signature == self.last_signature:
+            return None
+        self.last_signature = signature
+
+        media_dir = mw.col.media.dir()
+        html = [PREVIEW_HEADER]
+        if duplicados:
+            html.append(DUPLICATE_WARNING.format(count=duplicados))
+        if aviso:
+            html.append(FIELD_COUNT_WARNING.format(aviso=aviso))
+        html.append(CARD_TABLE_OPEN)
+        for j, campo in enumerate(valores):
+            html.append(FIELD_ROWS.format(nome=campos[j], valor=link_media(campo, media_dir)))
+        html.append("</table>")
+        if tags_str:
+            html.append(f"<p><b>Tags:</b> {tags_str}</p>")
+        html.append("</body></html>")
+        return ''.join(html)
+
+
+class PreviewScheduler:
+    # Agrupa rajadas de pedidos de renderização (digitação, checkboxes, tags,
+    # botões de formatação) em uma única renderização após um tempo ocioso.
+    # render_now() é o caminho rápido para navegação explícita.
+    def __init__(self, callback, delay_ms=DEFAULT_PREVIEW_DELAY_MS, parent=None):
+        self.callback = callback
+        self.requested = 0  # Pedidos de renderização recebidos
+        self.executed = 0  # Renderizações realmente executadas
+        self.timer = QTimer(parent)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.set_delay(delay_ms)
+
+    def set_delay(self, delay_ms):
+        self.timer.setInterval(max(0, int(delay_ms)))
+
+    def delay(self):
+        return self.timer.interval()
+
+    def request(self, *args):
+        # Reinicia o timer: só renderiza quando os sinais param de chegar
+        self.requested += 1
+        self.timer.start()
+
+    def render_now(self, *args):
+        self.requested += 1
+        self.flush()
+
+    def flush(self):
+        self.timer.stop()
+        self.executed += 1
+        self.callback()
+
+    def stats(self):
+        return {'requested': self.requested, 'executed': self.executed}
@@ -0,0 +1,94 @@
+# conftest.py
+
+# Os módulos do add-on usam imports relativos: o pacote é registrado sem
+# executar o __init__.py (que mexe no menu do Anki), como no benchmark.py.
+# Quando o PyQt6 está instalado, ele faz o papel do aqt.qt (sem janelas).
+# Sem o Anki instalado, o anki.utils é substituído por stubs como os do
+# benchmark.py.
+
+import os
+import random
+import re
+import sys
+import types
+import zlib
+
+import pytest
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = 'delimitadores_tests'
+
+
+def install_qt():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt6 import QtCore, QtGui, QtWidgets
+    except ImportError:
+        return
+    qt = types.ModuleType('aqt.qt')
+    for qt_module in (QtCore, QtGui, QtWidgets):
+        qt.__dict__.update({k: v for k, v in vars(qt_module).items() if not k.startswith('_')})
+    sys.modules.setdefault('aqt', types.ModuleType('aqt'))
+    sys.modules.setdefault('aqt.qt', qt)
+
+
+def install_anki():
+    try:
+        import anki.utils  # noqa: F401
+        return
+    except ImportError:
+        pass
+    strip_html_media = lambda html: re.sub(r'<[^>]+>', '', html)
+    utils = types.ModuleType('anki.utils')
+    utils.strip_html_media = strip_html_media
+    utils.field_checksum = lambda text: zlib.crc32(strip_html_media(text).encode())
+    utils.split_fields = lambda flds: flds.split('\x1f')
+    utils.ids2str = lambda ids: f"({','.join(str(i) for i in ids)})"
+    collection = types.ModuleType('anki.collection')
+    collection.AddNoteRequest = lambda note, deck_id: (note, deck_id)
+    sys.modules['anki'] = types.ModuleType('anki')
+    sys.modules['anki.utils'] = utils
+    sys.modules['anki.collection'] = collection
+
+
+package = types.ModuleType(PACKAGE)
+package.__path__ = [ADDON_DIR]
+sys.modules.setdefault(PACKAGE, package)
+install_qt()
+install_anki()
+
+
+@pytest.fixture
+def qapp():
+    QtWidgets = pytest.importorskip('PyQt6.QtWidgets')
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def edicoes_aleatorias(qapp):
+    # Edições aleatórias em um QTextEdit (trechos apagados, textos inseridos,
+    # documento apagado ou trocado), chamando check() depois de cada uma
+    from PyQt6.QtGui import QTextCursor
+
+    def aplicar(edit, textos, check, seed, count=2000):
+        rng = random.Random(seed)
+        for _ in range(count):
+            document = edit.document()
+            cursor = QTextCursor(document)
+            size = document.characterCount() - 1
+            start = rng.randint(0, size)
+            cursor.setPosition(start)
+            cursor.setPosition(rng.randint(start, size), QTextCursor.MoveMode.KeepAnchor)
+            action = rng.random()
+            if action < 0.05:
+                cursor.select(QTextCursor.SelectionType.Document)
+                cursor.removeSelectedText()
+            elif action < 0.1:
+                edit.setPlainText('\n'.join(rng.choice(textos) for _ in range(rng.randint(0, 5))))
+            elif action < 0.5:
+                cursor.removeSelectedText()
+            else:
+                cursor.insertText(rng.choice(textos))
+            check()
+
+    return aplicar
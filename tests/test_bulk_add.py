@@ -0,0 +1,115 @@
+# test_bulk_add.py
+
+import importlib
+import re
+
+from anki.utils import field_checksum
+
+bulk_add = importlib.import_module('delimitadores_tests.bulk_add')
+card_parser = importlib.import_module('delimitadores_tests.card_parser')
+duplicates = importlib.import_module('delimitadores_tests.duplicates')
+
+MODEL = {'id': 1, 'flds': [{'name': 'Frente'}, {'name': 'Verso'}]}
+
+
+class FakeNote:
+    def __init__(self, nid, fields, tags):
+        self.id = nid
+        self.fields = list(fields)
+        self.tags = list(tags)
+
+    def has_tag(self, tag):
+        return tag.lower() in (t.lower() for t in self.tags)
+
+
+class FakeCol:
+    # Só o que a inserção em lote e o DuplicateIndex usam; self.db é a própria coleção
+    def __init__(self, notes=()):
+        self.notes = {}  # id -> (campos, tags), como gravados na tabela notes
+        self.update_calls = []
+        self.db = self
+        for fields, tags in notes:
+            self.store(FakeNote(0, fields, tags))
+
+    def store(self, nota):
+        if not nota.id:
+            nota.id = len(self.notes) + 1
+        self.notes[nota.id] = (list(nota.fields), list(nota.tags))
+
+    def execute(self, sql, *args):
+        if sql.startswith('select id, csum'):
+            return [(nid, field_checksum(fields[0])) for nid, (fields, tags) in sorted(self.notes.items())]
+        ids = [int(nid) for nid in re.search(r'in \(([^)]*)\)', sql).group(1).split(',')]
+        return [(nid, '\x1f'.join(self.notes[nid][0]), ' '.join(self.notes[nid][1])) for nid in ids]
+
+    def new_note(self, modelo):
+        return FakeNote(0, [''] * len(modelo['flds']), [])
+
+    def add_notes(self, requests):
+        for nota, deck_id in requests:
+            self.store(nota)
+
+    def get_note(self, nid):
+        fields, tags = self.notes[nid]
+        return FakeNote(nid, fields, tags)
+
+    def update_notes(self, notes):
+        self.update_calls.append([nota.id for nota in notes])
+        for nota in notes:
+            self.store(nota)
+
+    def add_custom_undo_entry(self, name):
+        return 1
+
+    def merge_undo_entries(self, pos):
+        return None
+
+
+def card(line, *fields, tags=()):
+    return card_parser.ParsedCard(line, fields, tuple(tags))
+
+
+def run(col, cards, policy):
+    job = bulk_add.BulkAddJob(MODEL, 1, cards, policy)
+    job.run(col)
+    return job
+
+
+def test_pular_confere_de_novo_os_repetidos_do_mesmo_lote():
+    col = FakeCol([(['a', '1'], [])])
+    job = run(col, [card(0, 'a', 'x'), card(1, 'b', '2'), card(2, 'b', '3'), card(3, '<i>c</i>', '4')], duplicates.DUPLICATE_SKIP)
+    assert (job.added, job.skipped, job.processed) == (2, 2, 4)
+    assert [fields for fields, tags in col.notes.values()] == [['a', '1'], ['b', '2'], ['<i>c</i>', '4']]
+
+
+def test_permitir_adiciona_todos():
+    col = FakeCol([(['a', '1'], [])])
+    job = run(col, [card(0, 'a', '1'), card(1, 'a', '1')], duplicates.DUPLICATE_ALLOW)
+    assert (job.added, job.skipped) == (2, 0)
+    assert len(col.notes) == 3
+
+
+def test_atualizar_grava_so_a_nota_mais_antiga_e_so_se_mudou():
+    col = FakeCol([(['a', '1'], ['velha']), (['a', '2'], []), (['b', '3'], ['t'])])
+    cards = [
+        card(0, 'a', 'novo', tags=['nova']),
+        card(1, 'b', '3', tags=['T']),  # Mesmos campos e tag já existente (sem diferenciar maiúsculas)
+        card(2, 'c', '4'),
+        card(3, 'c', '5'),  # Repete o primeiro campo de um card novo do mesmo lote
+    ]
+    job = run(col, cards, duplicates.DUPLICATE_UPDATE)
+    assert (job.added, job.updated, job.unchanged, job.skipped) == (1, 2, 1, 0)
+    assert col.notes[1] == (['a', 'novo'], ['velha', 'nova'])
+    assert col.notes[2] == (['a', '2'], [])
+    assert col.notes[3] == (['b', '3'], ['t'])
+    assert col.notes[4] == (['c', '5'], [])
+    assert col.update_calls == [[1], [4]]
+
+
+def test_split_duplicates():
+    index = duplicates.DuplicateIndex(FakeCol([(['a', '1'], [])]), MODEL['id'])
+    batch = [card(0, 'a', 'x'), card(1, 'b', '1'), card(2, '<b>b</b>', '2'), card(3, ' ', '3'), card(4, ' ', '4')]
+    new, existing, deferred = bulk_add.split_duplicates(index, batch)
+    assert [c.line for c in new] == [1, 3, 4]  # Primeiro campo vazio nunca é duplicado
+    assert [(c.line, nid) for c, nid in existing] == [(0, 1)]
+    assert [c.line for c in deferred] == [2]
@@ -0,0 +1,41 @@
+# test_card_parser.py
+
+import importlib
+
+card_parser = importlib.import_module('delimitadores_tests.card_parser')
+
+TODOS = ('\t', ',', ';', ':', '?', '/', '!', '|')
+
+
+def test_menor_e_maior_nao_sao_tag():
+    assert card_parser.split_line('a < b ; c > d', (';',)) == ('a < b', 'c > d')
+
+
+def test_aspas_no_meio_do_campo_nao_protegem():
+    assert card_parser.split_line('12" ; 15"', (';',)) == ('12"', '15"')
+
+
+def test_delimitadores_protegidos():
+    assert card_parser.split_line('<span style="color:red">x</span> : y', TODOS) == ('<span style="color:red">x</span>', 'y')
+    assert card_parser.split_line('{{c1::a;b}} ; verso', (';',)) == ('{{c1::a;b}}', 'verso')
+    assert card_parser.split_line('"a; b" ; c', (';',)) == ('a; b', 'c')
+    assert card_parser.split_line('Veja https://x.com/a?b=1 : resposta', TODOS) == ('Veja https://x.com/a?b=1', 'resposta')
+
+
+def test_campo_entre_aspas_perde_as_aspas():
+    assert card_parser.split_line('"diz ""oi""; tchau" ; c', (';',)) == ('diz "oi"; tchau', 'c')
+    assert card_parser.split_line('a ; "b"', (';',)) == ('a', 'b')
+    assert card_parser.split_line('"" ; b', (';',)) == ('', 'b')
+    assert card_parser.split_line('a ; "b" c', (';',)) == ('a', '"b" c')
+
+
+def test_primeiro_delimitador_marcado():
+    assert card_parser.split_line('a , b ; c', (';', ',')) == ('a , b', 'c')
+    assert card_parser.split_line('sem delimitador', (';',)) is None
+
+
+def test_scan_encontra_tags_e_delimitadores_de_uma_vez():
+    linha = '<b>x</b> ; "a; b" ; a < b'
+    tags, delim, positions = card_parser.split_plan((';',)).scan(linha)
+    assert [linha[start:end] for start, end in tags] == ['<b>', '</b>']
+    assert delim == ';' and positions == [9, 18]
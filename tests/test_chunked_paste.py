@@ -0,0 +1,40 @@
+# test_chunked_paste.py
+
+import importlib
+
+import pytest
+
+pytest.importorskip('PyQt6')
+from PyQt6.QtWidgets import QTextEdit
+
+chunked_paste = importlib.import_module('delimitadores_tests.chunked_paste')
+
+LINHAS = [f'{n} ; verso' for n in range(100)]
+
+
+@pytest.fixture
+def colagem(qapp):
+    edit = QTextEdit()
+    finished = []
+    job = chunked_paste.ChunkedPaste(edit, iter(LINHAS), lambda: finished.append(True), batch_lines=10)
+    job.start()
+    yield qapp, edit, job, finished
+
+
+def test_complete_insere_os_lotes_que_faltam(colagem):
+    app, edit, job, finished = colagem
+    assert job.running and edit.document().blockCount() == 10
+    job.complete()
+    assert not job.running and not edit.isReadOnly() and finished == [True]
+    assert edit.toPlainText() == '\n'.join(LINHAS)
+    # O timer que já estava agendado não insere mais nada
+    app.processEvents()
+    assert edit.toPlainText() == '\n'.join(LINHAS)
+
+
+def test_cancel_mantem_so_os_lotes_inseridos(colagem):
+    app, edit, job, finished = colagem
+    job.cancel()
+    app.processEvents()
+    assert not job.running and not edit.isReadOnly()
+    assert edit.toPlainText() == '\n'.join(LINHAS[:10])
@@ -0,0 +1,22 @@
+# test_file_import.py
+
+import importlib
+
+import pytest
+
+file_import = importlib.import_module('delimitadores_tests.file_import')
+
+
+def test_celula_maior_que_o_limite_padrao_do_csv(tmp_path):
+    path = tmp_path / 'grande.csv'
+    grande = 'x' * 200000
+    path.write_text(f'frente,verso\n{grande},b\n', encoding='utf-8')
+    assert file_import.preview_rows(str(path)) == [['frente', 'verso'], [grande, 'b']]
+
+
+def test_xlsx_danificado(tmp_path):
+    pytest.importorskip('openpyxl')
+    path = tmp_path / 'danificado.xlsx'
+    path.write_bytes(b'isto nao e um zip')
+    with pytest.raises(file_import.FileImportError):
+        file_import.preview_rows(str(path))
@@ -0,0 +1,38 @@
+# test_line_sync.py
+
+import importlib
+
+import pytest
+
+pytest.importorskip('PyQt6')
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtWidgets import QTextEdit
+
+line_sync = importlib.import_module('delimitadores_tests.line_sync')
+
+
+@pytest.fixture
+def editores(qapp):
+    cards, tags = QTextEdit(), QTextEdit()
+    cards.setPlainText("a ; 1\nb ; 2\nc ; 3")
+    tags.setPlainText("t1\nt2\nt3")
+    sync = line_sync.TagsLineSync(cards.document(), tags)
+    yield cards, tags, sync
+
+
+def test_selecionar_tudo_e_apagar(editores):
+    cards, tags, sync = editores
+    cursor = cards.textCursor()
+    cursor.select(QTextCursor.SelectionType.Document)
+    cursor.removeSelectedText()
+    assert cards.document().blockCount() == 1
+    assert tags.document().blockCount() == 1
+
+
+def test_edicoes_aleatorias_mantem_uma_etiqueta_por_linha(editores, edicoes_aleatorias):
+    cards, tags, sync = editores
+
+    def check():
+        assert tags.document().blockCount() == cards.document().blockCount()
+
+    edicoes_aleatorias(cards, ['x', '\n', 'a ; b\n', '\n\n', 'x ; y'], check, seed=7)
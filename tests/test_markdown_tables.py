@@ -0,0 +1,20 @@
+# test_markdown_tables.py
+
+import importlib
+import time
+
+markdown_tables = importlib.import_module('delimitadores_tests.markdown_tables')
+
+
+def test_tabela_convertida_no_lugar():
+    texto = "antes\n| A | B |\n| --- | :---: |\n| 1 | 2 |\ndepois"
+    html = markdown_tables.convert_markdown_to_html(texto, compact=True)
+    assert html == "antes\n<table><thead><tr><th>A</th><th>B</th></tr></thead><tbody><tr><td>1</td><td>2</td></tr></tbody></table>\ndepois"
+
+
+def test_separador_longo_que_nao_casa_em_tempo_linear():
+    texto = "| A | B |\n|" + "-" * 5000 + " nota\n| 1 | 2 |"
+    inicio = time.perf_counter()
+    html = markdown_tables.convert_markdown_to_html(texto)
+    assert time.perf_counter() - inicio < 0.5
+    assert '<table>' not in html
@@ -0,0 +1,58 @@
+# test_media_index.py
+
+import importlib
+import time
+
+import pytest
+
+pytest.importorskip('PyQt6')
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtWidgets import QTextEdit
+
+media_index = importlib.import_module('delimitadores_tests.media_index')
+
+
+@pytest.fixture
+def editor(qapp):
+    cards = QTextEdit()
+    cards.setPlainText('<img src="a.png"> ; 1\nb ; 2\n<img src="b.png"> ; <img src="a.png">')
+    index = media_index.MediaReferenceIndex(cards.document())
+    yield cards, index
+
+
+def test_linhas_por_nome(editor):
+    cards, index = editor
+    assert index.lines('a.png') == [0, 2]
+    assert index.lines('b.png') == [2]
+    assert index.lines('c.png') == []
+
+
+def test_src_depois_de_outros_atributos(editor):
+    cards, index = editor
+    cards.setPlainText('<img alt="" src="a.png"> ; <img data-src="b.png" src="c.png">')
+    texto = cards.toPlainText()
+    assert [texto[start:end] for start, end in index.spans('a.png')] == ['a.png']
+    assert index.lines('b.png') == []
+    assert index.lines('c.png') == [0]
+
+
+def test_edicoes_aleatorias_batem_com_o_indice_refeito(editor, edicoes_aleatorias):
+    cards, index = editor
+
+    def check():
+        expected = media_index.MediaReferenceIndex(cards.document())
+        assert index.block_refs == expected.block_refs
+        assert index.counts == expected.counts
+
+    textos = ['x', '\n', '<img src="a.png">', '<img src="c.png">\n', '\n\n']
+    edicoes_aleatorias(cards, textos, check, seed=11)
+
+    # Quebrar linhas em um documento grande não pode percorrer o índice inteiro
+    cards.setPlainText('\n'.join(f'<img src="img{n}.png"> ; {n}' for n in range(50000)))
+    index.rebuild()
+    cursor = QTextCursor(cards.document())
+    inicio = time.perf_counter()
+    for _ in range(100):
+        cursor.insertText('\n')
+    assert time.perf_counter() - inicio < 0.5
+    assert index.lines('img49999.png') == [50099]
@@ -0,0 +1,66 @@
+# thumbnails.py
+
+import os
+from aqt.qt import QImage, QImageReader, QSize, Qt
+from .utils import THUMBNAIL_DIR, file_hash
+
+# Tamanho das miniaturas na lista do Gerenciar Mídia e na janela de visualização
+ICON_SIZE = QSize(96, 96)
+PREVIEW_SIZE = QSize(600, 400)
+
+# Imagens que o QImageReader consegue decodificar como miniatura
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+
+def is_image(file_name):
+    return os.path.splitext(file_name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def decode_scaled(path, size):
+    # Decodifica já na resolução final (o QImageReader reduz durante a leitura,
+    # sem montar a imagem inteira em memória para depois reduzir)
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid() and (original.width() > size.width() or original.height() > size.height()):
+        reader.setScaledSize(original.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+
+class ThumbnailCache:
+    # Miniaturas das mídias guardadas em disco pelo hash do arquivo (o mesmo
+    # conteúdo com outro nome reaproveita a miniatura). A decodificação roda
+    # fora da thread da interface; só QImage é usado lá, nunca QPixmap.
+    def __init__(self, mw, media_dir, cache_dir=THUMBNAIL_DIR):
+        self.mw = mw
+        self.media_dir = media_dir
+        self.cache_dir = cache_dir
+
+    def cache_path(self, path, size):
+        return os.path.join(self.cache_dir, f"{file_hash(path)}_{size.width()}x{size.height()}.png")
+
+    def load(self, file_name, size):
+        # Executado em segundo plano: lê do cache ou decodifica e grava no cache
+        path = os.path.join(self.media_dir, file_name)
+        cached = self.cache_path(path, size)
+        if os.path.exists(cached):
+            image = QImage(cached)
+            if not image.isNull():
+                return image
+        image = decode_scaled(path, size)
+        if not image.isNull():
+            os.makedirs(self.cache_dir, exist_ok=True)
+            image.save(cached, 'PNG')
+        return image
+
+    def request(self, file_name, size, callback):
+        # callback(file_name, QImage ou None) é chamado na thread da interface
+        def on_done(future):
+            try:
+                image = future.result()
+            except Exception as e:
+                print(f"Erro ao gerar miniatura de {file_name}: {e}")
+                image = None
+            callback(file_name, image if image is not None and not image.isNull() else None)
+
+        self.mw.taskman.run_in_background(lambda: self.load(file_name, size), on_done)
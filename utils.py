@@ -1,6 +1,27 @@
 # utils.py
 
+import hashlib
 import os
 
 # Caminho para o arquivo de configuração
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
\ No newline at end of file
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
+
+# Pasta do cache de miniaturas das mídias (user_files é preservada nas atualizações do add-on)
+THUMBNAIL_DIR = os.path.join(os.path.dirname(__file__), 'user_files', 'thumbnails')
+
+# (caminho, mtime, tamanho) -> hash do conteúdo, para não reler arquivos que não mudaram
+_hash_memo = {}
+
+
+def file_hash(path):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _hash_memo.get(key)
+    if digest is None:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+        _hash_memo[key] = digest
+    return digest
@@ -1,18 +1,54 @@
 # visualizar.py
 
-import os
-import re
-import base64
+from collections import OrderedDict
 from aqt import mw
 from aqt.qt import *
 from aqt.utils import showWarning, showInfo
 from aqt.webview import QWebEngineView
+from .card_parser import parse_cards
+from .preview import link_media, media_base_url, DUPLICATE_WARNING
+
+# Quantidade de páginas HTML renderizadas mantidas em memória
+RENDERED_CACHE_SIZE = 16
+
+
+class CardListModel(QAbstractListModel):
+    # Modelo da lista lateral: gera os rótulos "Card N" sob demanda em vez de
+    # criar um QListWidgetItem para cada card
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.count = 0
+        self.duplicate_rows = set()
+
+    def set_count(self, count, duplicate_rows=()):
+        self.beginResetModel()
+        self.count = count
+        self.duplicate_rows = set(duplicate_rows)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.count
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self.count:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.row() in self.duplicate_rows:
+                return f"Card {index.row() + 1} (duplicado)"
+            return f"Card {index.row() + 1}"
+        if role == Qt.ItemDataRole.ForegroundRole and index.row() in self.duplicate_rows:
+            return QColor('#b00020')
+        return None
+
 
 class VisualizarCards(QDialog):
     def __init__(self, parent):
         super().__init__(None, Qt.WindowType.Window | Qt.WindowType.WindowMinimizeButtonHint | Qt.WindowType.WindowCloseButtonHint | Qt.WindowType.WindowMaximizeButtonHint)
         self.parent = parent
-        self.cards_preview_list = []
+        self.cards = []  # Registros ParsedCard de cada card válido
+        self.campos = []
+        self.duplicates = {}  # índice do card -> ids das notas com o mesmo primeiro campo
+        self.rendered_cache = OrderedDict()  # índice do card -> HTML renderizado
         self.cards_visible = True  # Estado inicial: lista de cards visível
         self.setup_ui()
         self.view_cards_dialog()
@@ -33,8 +69,11 @@ class VisualizarCards(QDialog):
         self.splitter = QSplitter(Qt.Orientation.Horizontal)
         
         # Lista de cards (Card 1, Card 2, etc.)
-        self.card_list_widget = QListWidget()
-        self.card_list_widget.currentItemChanged.connect(self.update_card_preview)
+        self.card_list_model = CardListModel(self)
+        self.card_list_widget = QListView()
+        self.card_list_widget.setUniformItemSizes(True)
+        self.card_list_widget.setModel(self.card_list_model)
+        self.card_list_widget.selectionModel().currentRowChanged.connect(self.update_card_preview)
         self.card_list_widget.setMaximumWidth(200)  # Tamanho máximo inicial
         self.card_list_widget.setMinimumWidth(100)  # Tamanho mínimo para evitar colapso total
         self.splitter.addWidget(self.card_list_widget)
@@ -58,118 +97,86 @@ class VisualizarCards(QDialog):
         self.setLayout(main_layout)
 
     def generate_card_previews(self):
-        linhas = self.parent.txt_entrada.toPlainText().strip().split('\n')
-        if not linhas:
-            return []
+        # Gera apenas registros leves (ParsedCard); o HTML é montado sob demanda
         delimitadores = [chk.simbolo for chk in self.parent.chk_delimitadores.values() if chk.isChecked()]
-        if not delimitadores or not self.parent.lista_decks.currentItem() or not self.parent.lista_notetypes.currentItem():
+        if not delimitadores or not self.parent.lista_decks.current_name() or not self.parent.lista_notetypes.current_name():
+            self.duplicates = {}
             return []
-        modelo = mw.col.models.by_name(self.parent.lista_notetypes.currentItem().text())
-        campos = [fld['name'] for fld in modelo['flds']]
-        num_fields = len(campos)
-        
-        # Preparação de tags: sempre usar as tags linha por linha
-        tags_lines = self.parent.txt_tags.toPlainText().strip().splitlines()
-        
-        cards_preview_list = []
-        card_index = 0  # Para numeração de cards
-        media_dir = mw.col.media.dir()
+        info = self.parent.current_notetype()
+        self.campos = info.fields
+        cards = parse_cards(
+            self.parent.txt_entrada.toPlainText(),
+            self.parent.txt_tags.toPlainText(),
+            delimitadores,
+            len(self.campos),
+            self.parent.chk_num_tags.isChecked(),
+        )
+        # Duplicados: um acesso ao índice (já montado) por card, uma consulta só para as candidatas
+        index = self.parent.duplicate_index(info.id)
+        self.duplicates = index.find_all((i, card.fields[0]) for i, card in enumerate(cards)) if index is not None else {}
+        return cards
 
-        def get_mime_type(file_name):
-            ext = os.path.splitext(file_name)[1].lower()
-            return {
-                '.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.gif': 'image/gif',
-                '.mp3': 'audio/mpeg', '.wav': 'audio/wav', '.ogg': 'audio/ogg', '.mp4': 'video/mp4',
-                '.webm': 'video/webm'
-            }.get(ext, 'application/octet-stream')
-
-        def replace_media_src(match, media_type="img"):
-            file_name = match.group(1)
-            full_path = os.path.join(media_dir, file_name)
-            if not os.path.exists(full_path):
-                print(f"Arquivo não encontrado: {full_path}")
-                return match.group(0)
-            try:
-                with open(full_path, 'rb') as f:
-                    base64_data = base64.b64encode(f.read()).decode('utf-8')
-                mime_type = get_mime_type(file_name)
-                return f'<{media_type} src="data:{mime_type};base64,{base64_data}"' + (" controls width=\"320\" height=\"240\"" if media_type == "video" else "")
-            except Exception as e:
-                print(f"Erro ao codificar {media_type} em base64: {str(e)}")
-                return match.group(0)
-        
-        for i, linha in enumerate(linhas):
-            if not linha.strip():
-                continue
-                
-            # Usar a linha específica de tags para este card
-            tags_for_card = []
-            if i < len(tags_lines):
-                tags_for_card = [tag.strip() for tag in tags_lines[i].split(',') if tag.strip()]
-            
-            # Remover números das tags se necessário
-            tags_for_card = [tag.strip().rstrip('0123456789') for tag in tags_for_card if tag.strip()]
-            
-            for delim in delimitadores:
-                if delim in linha:
-                    partes = linha.split(delim)
-                    card_html = """
+    def render_card(self, index):
+        # Monta o HTML de um card, reaproveitando as páginas renderizadas recentemente
+        html = self.rendered_cache.get(index)
+        if html is not None:
+            self.rendered_cache.move_to_end(index)
+            return html
+        card = self.cards[index]
+        media_dir = mw.col.media.dir()
+        card_html = ["""
                     <html><body style="font-family: Arial, sans-serif; background-color: #f9f9f9; padding: 10px;">
+                    """]
+        if index in self.duplicates:
+            card_html.append(DUPLICATE_WARNING.format(count=len(self.duplicates[index])))
+        card_html.append("""
                     <table style="width: 100%; border-collapse: separate; border-spacing: 0; box-shadow: 0 4px 8px rgba(0,0,0,0.1); border-radius: 8px; margin-bottom: 20px;">
-                    """
-                    for j, campo in enumerate(partes[:num_fields]):  # Limita ao número de campos do tipo de nota
-                        campo_formatado = campo.strip().replace('\n', '<br>')
-                        for tag, type_ in [('<img', 'img'), ('<source', 'source'), ('<video', 'video')]:
-                            if tag in campo_formatado:
-                                campo_formatado = re.sub(rf'{tag} src="([^"]+)"', lambda m: replace_media_src(m, type_), campo_formatado)
-                        card_html += f"""
-                        <tr><td style="background-color: #444; color: white; padding: 12px; text-align: center; font-weight: bold; font-size: 16px; border-top-left-radius: 8px; border-top-right-radius: 8px;">{campos[j]}</td></tr>
+                    """)
+        for j, campo in enumerate(card.fields):
+            campo_formatado = link_media(campo.replace('\n', '<br>'), media_dir)
+            card_html.append(f"""
+                        <tr><td style="background-color: #444; color: white; padding: 12px; text-align: center; font-weight: bold; font-size: 16px; border-top-left-radius: 8px; border-top-right-radius: 8px;">{self.campos[j]}</td></tr>
                         <tr><td style="padding: 15px; border: 1px solid #ddd; background-color: white; border-bottom-left-radius: 8px; border-bottom-right-radius: 8px;">{campo_formatado}</td></tr>
-                        """
-                    card_html += "</table>"
-                    
-                    # Adicionar as tags ao HTML
-                    if tags_for_card:
-                        if self.parent.chk_num_tags.isChecked():
-                            # Adicionar número ao final de cada tag baseado no índice do card
-                            tags_str = ', '.join(f"{tag}{card_index + 1}" for tag in tags_for_card)
-                        else:
-                            # Usar tags sem numeração
-                            tags_str = ', '.join(tags_for_card)
-                        
-                        card_html += f"<p><b>Tags:</b> {tags_str}</p>"
-                    
-                    card_html += "</body></html>"
-                    cards_preview_list.append(card_html)
-                    card_index += 1
-                    break
-                    
-        return cards_preview_list
+                        """)
+        card_html.append("</table>")
+        
+        # Adicionar as tags ao HTML (já numeradas pelo parser, se for o caso)
+        if card.tags:
+            card_html.append(f"<p><b>Tags:</b> {', '.join(card.tags)}</p>")
+        
+        card_html.append("</body></html>")
+        html = ''.join(card_html)
+        self.rendered_cache[index] = html
+        if len(self.rendered_cache) > RENDERED_CACHE_SIZE:
+            self.rendered_cache.popitem(last=False)
+        return html
+
+    def set_cards(self, cards):
+        self.cards = cards
+        self.rendered_cache.clear()
+        self.card_list_model.set_count(len(cards), self.duplicates)
 
     def view_cards_dialog(self):
         linhas = self.parent.txt_entrada.toPlainText().strip().split('\n')
         delimitadores = [chk.simbolo for chk in self.parent.chk_delimitadores.values() if chk.isChecked()]
-        if not linhas or not delimitadores or not self.parent.lista_decks.currentItem() or not self.parent.lista_notetypes.currentItem():
+        if not linhas or not delimitadores or not self.parent.lista_decks.current_name() or not self.parent.lista_notetypes.current_name():
             showWarning("Digite conteúdo, selecione um delimitador, deck e modelo para visualizar!")
             return
-        self.cards_preview_list = self.generate_card_previews()
-        if not self.cards_preview_list:
+        cards = self.generate_card_previews()
+        if not cards:
             showWarning("Nenhum card válido para visualizar!")
             return
-        self.card_list_widget.addItems([f"Card {i+1}" for i in range(len(self.cards_preview_list))])
-        if self.cards_preview_list:
-            self.card_list_widget.setCurrentRow(0)
+        self.set_cards(cards)
+        self.card_list_widget.setCurrentIndex(self.card_list_model.index(0))
 
     def update_card_preview(self, current, previous):
-        if current:  # Atualiza a pré-visualização apenas se houver um item selecionado
-            index = self.card_list_widget.row(current)
-            if index < len(self.cards_preview_list):
-                self.card_preview_webview.setHtml(self.cards_preview_list[index])
-                self.card_preview_webview.page().runJavaScript("""
-                    document.body.style.transition = 'background-color 0.5s';
-                    document.body.style.backgroundColor = '#fff9e6';
-                    setTimeout(() => document.body.style.backgroundColor = '#f9f9f9', 500);
-                """)
+        if current.isValid() and current.row() < len(self.cards):  # Atualiza a pré-visualização apenas se houver um card selecionado
+            self.card_preview_webview.setHtml(self.render_card(current.row()), media_base_url())
+            self.card_preview_webview.page().runJavaScript("""
+                document.body.style.transition = 'background-color 0.5s';
+                document.body.style.backgroundColor = '#fff9e6';
+                setTimeout(() => document.body.style.backgroundColor = '#f9f9f9', 500);
+            """)
         else:
             self.card_preview_webview.setHtml("")  # Limpa a pré-visualização se não houver seleção
 
@@ -181,15 +188,12 @@ class VisualizarCards(QDialog):
 
     def update_preview(self):
         # Atualiza a lista de cards e a pré-visualização quando há qualquer alteração
-        self.cards_preview_list = self.generate_card_previews()
-        current_row = self.card_list_widget.currentRow()
-        self.card_list_widget.clear()
-        if self.cards_preview_list:
-            self.card_list_widget.addItems([f"Card {i+1}" for i in range(len(self.cards_preview_list))])
+        current_row = self.card_list_widget.currentIndex().row()
+        self.set_cards(self.generate_card_previews())
+        if self.cards:
             # Tenta manter o mesmo card selecionado, se possível
-            if current_row >= 0 and current_row < len(self.cards_preview_list):
-                self.card_list_widget.setCurrentRow(current_row)
-            else:
-                self.card_list_widget.setCurrentRow(0)  # Seleciona o primeiro card se a posição anterior não for válida
+            if current_row < 0 or current_row >= len(self.cards):
+                current_row = 0  # Seleciona o primeiro card se a posição anterior não for válida
+            self.card_list_widget.setCurrentIndex(self.card_list_model.index(current_row))
         else:
             self.card_preview_webview.setHtml("")  # Limpa a pré-visualização se não houver cards
\ No newline at end of file